@@ -3,24 +3,29 @@ CustomDocxParser.py
 
 Unified DOCX parser that extracts paragraphs, runs, tables, embedded objects, and detailed run/paragraph/cell formatting.
 Composes functionality from:
+ - StreamingDocxParser.py: Single pass over word/document.xml producing all of the below (default)
  - DocParser.py: Paragraphs/headings/tables with rich formatting
  - TableNew.py: All tables (including nested), with run properties
- - ExtractRunPropertiesFromDOCxXML.py: Raw DOCX XML run/text properties
+ - ExtractRunPropertiesFromDOCxXML.py: Raw DOCX XML run/text properties (read from the package in place)
  - DocParserAI_Main.py: Orchestrates parsing and merging
 
-Outputs a comprehensive JSON representation of all document elements, saved in 'ParsedJSON' folder.
+Outputs a comprehensive JSON-compatible representation of all document elements, saved in the
+'ParsedJSON' folder in the sectioned compact format of ParsedStore.py (<name>_PARSED.parsed).
+Set PARSED_DEBUG_JSON=1 (or pass debug_json=True) to also write a pretty-printed <name>_PARSED.json.
 """
 
 import os
-import json
 from datetime import datetime
 
 from DocParser import parse_docx
 from TableNew import extract_all_tables_with_run_properties
-from ExtractRunPropertiesFromDOCxXML import rename_docx_to_zip, extract_text_properties
+from ExtractRunPropertiesFromDOCxXML import extract_text_properties
+from StreamingDocxParser import parse_docx_single_pass
+from ParsedStore import write_parsed, export_pretty_json, LEGACY_JSON_EXT, PARSED_EXT
 
 PARSED_JSON_DIR = os.path.join(os.path.dirname(__file__), "ParsedJSON")
 os.makedirs(PARSED_JSON_DIR, exist_ok=True)
+PARSED_DEBUG_JSON = os.environ.get("PARSED_DEBUG_JSON", "") not in ("", "0", "false", "False")
 
 def annotate_section_path_and_idx(parsed_list):
     current_section = []
@@ -50,12 +55,15 @@ def annotate_section_path_and_idx(parsed_list):
             entry['para_idx'] = None
     return parsed_list
 
-def parse_docx_comprehensively(docx_path):
+def parse_docx_comprehensively(docx_path, single_pass=True, debug_json=PARSED_DEBUG_JSON):
     """
     Parses a DOCX file using multiple strategies and merges results into a rich JSON structure.
 
     Args:
         docx_path (str): Path to .docx file.
+        single_pass (bool): Use StreamingDocxParser (one read of the package). False runs
+            the original three-pass path, which produces the same output.
+        debug_json (bool): Also export the result as pretty-printed JSON.
 
     Returns:
         dict: Merged JSON structure with keys:
@@ -68,16 +76,19 @@ def parse_docx_comprehensively(docx_path):
     if not os.path.exists(docx_path):
         raise FileNotFoundError(f"File not found: {docx_path}")
 
-    print("[CustomDocxParser] Running DocParser.py logic...")
-    paragraphs_and_tables = parse_docx(docx_path)
-    paragraphs_and_tables = annotate_section_path_and_idx(paragraphs_and_tables)
+    if single_pass:
+        print("[CustomDocxParser] Running StreamingDocxParser.py logic...")
+        paragraphs_and_tables, tables_runs, text_runs_properties = parse_docx_single_pass(docx_path)
+    else:
+        print("[CustomDocxParser] Running DocParser.py logic...")
+        paragraphs_and_tables = parse_docx(docx_path)
 
-    print("[CustomDocxParser] Running TableNew.py logic...")
-    tables_runs = extract_all_tables_with_run_properties(docx_path)
+        print("[CustomDocxParser] Running TableNew.py logic...")
+        tables_runs = extract_all_tables_with_run_properties(docx_path)
 
-    print("[CustomDocxParser] Running ExtractRunPropertiesFromDOCxXML.py logic...")
-    zip_path = rename_docx_to_zip(docx_path)
-    text_runs_properties = extract_text_properties(zip_path)
+        print("[CustomDocxParser] Running ExtractRunPropertiesFromDOCxXML.py logic...")
+        text_runs_properties = extract_text_properties(docx_path)
+    paragraphs_and_tables = annotate_section_path_and_idx(paragraphs_and_tables)
 
     parsed_json = {
         "parsed_at": datetime.utcnow().isoformat(),
@@ -88,10 +99,11 @@ def parse_docx_comprehensively(docx_path):
     }
 
     base = os.path.splitext(os.path.basename(docx_path))[0]
-    out_path = os.path.join(PARSED_JSON_DIR, f"{base}_PARSED.json")
-    with open(out_path, "w", encoding="utf-8") as jf:
-        json.dump(parsed_json, jf, ensure_ascii=False, indent=2)
-    print(f"[CustomDocxParser] ✅ Parsed JSON saved to: {out_path}")
+    out_path = write_parsed(os.path.join(PARSED_JSON_DIR, base + PARSED_EXT), parsed_json)
+    print(f"[CustomDocxParser] ✅ Parsed output saved to: {out_path}")
+    if debug_json:
+        json_path = export_pretty_json(parsed_json, os.path.join(PARSED_JSON_DIR, base + LEGACY_JSON_EXT))
+        print(f"[CustomDocxParser] Debug JSON export saved to: {json_path}")
 
     return parsed_json
 
@@ -8,70 +8,96 @@ import zipfile
 import xml.etree.ElementTree as ET
 import json
 
-def rename_docx_to_zip(docx_path):
-    base, ext = os.path.splitext(docx_path)
-    if ext.lower() != ".docx":
-        raise ValueError("Input file must be a .docx file")
-    zip_path = base + ".zip"
-    with open(docx_path, 'rb') as f_in, open(zip_path, 'wb') as f_out:
-        f_out.write(f_in.read())
-    return zip_path
+NS = {
+    'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+}
 
-def extract_text_properties(zip_path):
-    ns = {
-        'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+def run_text_properties(run, ns=NS):
+    """
+    Describes one w:r element as {"text", "properties"}, or returns None if the run has no w:t.
+    """
+    rpr = run.find('w:rPr', ns)
+    t = run.find('w:t', ns)
+    if t is None:
+        return None
+    text = t.text
+    properties = []
+    if rpr is not None:
+        for elem in rpr:
+            tag = elem.tag
+            tag_clean = tag.split('}')[-1]
+            attrib = elem.attrib
+            if tag_clean == "b":
+                properties.append("Bold")
+            elif tag_clean == "bCs":
+                properties.append("Bold (Complex Script)")
+            elif tag_clean == "i":
+                properties.append("Italic")
+            elif tag_clean == "iCs":
+                properties.append("Italic (Complex Script)")
+            elif tag_clean == "highlight":
+                color = attrib.get('{%s}val' % ns['w'], attrib.get('val', ''))
+                properties.append(f"Highlight: {color}")
+            elif tag_clean == "u":
+                underline = attrib.get('{%s}val' % ns['w'], attrib.get('val', ''))
+                properties.append(f"Underline: {underline}")
+            elif tag_clean == "sz":
+                sz = attrib.get('{%s}val' % ns['w'], attrib.get('val', ''))
+                if sz:
+                    properties.append(f"Font Size: {int(sz)//2}pt")
+            elif tag_clean == "szCs":
+                szcs = attrib.get('{%s}val' % ns['w'], attrib.get('val', ''))
+                if szcs:
+                    properties.append(f"Font Size (Complex Script): {int(szcs)//2}pt")
+            else:
+                properties.append(f"{tag_clean}: {attrib}")
+    return {
+        "text": text,
+        "properties": properties if properties else None
     }
+
+def extract_text_properties(source):
+    """
+    Run text and properties of every w:r in word/document.xml, in document order.
+
+    A .docx is a zip package, so it is opened in place; no copy is written.
+    The XML is streamed with iterparse: each run is released once described, and each
+    body-level block (paragraph, table, ...) is dropped from the body once it ends, so
+    only the block being read is held in memory.
+
+    Args:
+        source (str or zipfile.ZipFile): Path to the .docx, or a ZipFile already
+            opened by another parse stage (left open).
+    """
+    if isinstance(source, zipfile.ZipFile):
+        return _text_properties_from_zip(source)
+    with zipfile.ZipFile(source) as zf:
+        return _text_properties_from_zip(zf)
+
+def _text_properties_from_zip(zf, ns=NS):
+    run_tag = '{%s}r' % ns['w']
+    body_tag = '{%s}body' % ns['w']
     text_info_list = []
-    with zipfile.ZipFile(zip_path) as zf:
-        with zf.open('word/document.xml') as doc_xml:
-            tree = ET.parse(doc_xml)
-            root = tree.getroot()
-            for run in root.iterfind('.//w:r', ns):
-                rpr = run.find('w:rPr', ns)
-                t = run.find('w:t', ns)
-                if t is not None:
-                    text = t.text
-                    properties = []
-                    if rpr is not None:
-                        for elem in rpr:
-                            tag = elem.tag
-                            tag_clean = tag.split('}')[-1]
-                            attrib = elem.attrib
-                            if tag_clean == "b":
-                                properties.append("Bold")
-                            elif tag_clean == "bCs":
-                                properties.append("Bold (Complex Script)")
-                            elif tag_clean == "i":
-                                properties.append("Italic")
-                            elif tag_clean == "iCs":
-                                properties.append("Italic (Complex Script)")
-                            elif tag_clean == "highlight":
-                                color = attrib.get('{%s}val' % ns['w'], attrib.get('val', ''))
-                                properties.append(f"Highlight: {color}")
-                            elif tag_clean == "u":
-                                underline = attrib.get('{%s}val' % ns['w'], attrib.get('val', ''))
-                                properties.append(f"Underline: {underline}")
-                            elif tag_clean == "sz":
-                                sz = attrib.get('{%s}val' % ns['w'], attrib.get('val', ''))
-                                if sz:
-                                    properties.append(f"Font Size: {int(sz)//2}pt")
-                            elif tag_clean == "szCs":
-                                szcs = attrib.get('{%s}val' % ns['w'], attrib.get('val', ''))
-                                if szcs:
-                                    properties.append(f"Font Size (Complex Script): {int(szcs)//2}pt")
-                            else:
-                                properties.append(f"{tag_clean}: {attrib}")
-                    text_info_list.append({
-                        "text": text,
-                        "properties": properties if properties else None
-                    })
+    body = None
+    with zf.open('word/document.xml') as doc_xml:
+        for event, elem in ET.iterparse(doc_xml, events=('start', 'end')):
+            if event == 'start':
+                if body is None and elem.tag == body_tag:
+                    body = elem
+                continue
+            if elem.tag == run_tag:
+                info = run_text_properties(elem, ns)
+                if info is not None:
+                    text_info_list.append(info)
+                elem.clear()
+            if body is not None and len(body) and body[-1] is elem:
+                # A finished top-level block: every run in it has been read.
+                body.remove(elem)
     return text_info_list
 
 if __name__ == "__main__":
     docx_file = '..//DocParser_AI//Files//PS00082.docx'
-    zip_file = rename_docx_to_zip(docx_file)
-    print(f"Renamed {docx_file} to {zip_file}")
-    text_properties = extract_text_properties(zip_file)
+    text_properties = extract_text_properties(docx_file)
     json_filename = os.path.splitext(docx_file)[0] + "_text_properties.json"
     with open(json_filename, "w", encoding="utf-8") as jf:
         json.dump(text_properties, jf, ensure_ascii=False, indent=2)
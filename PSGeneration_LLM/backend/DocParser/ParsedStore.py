@@ -0,0 +1,118 @@
+"""
+ParsedStore.py
+
+Sectioned, compact on-disk format for parser output (<doc_id>_PARSED.parsed).
+
+Layout: a magic line, then for every top-level key of the parsed dict a
+one-line JSON section header followed by exactly header["length"] bytes of
+body. List sections hold one compact JSON item per line (JSON-lines); other
+values are a single JSON line.
+
+    PSPARSED/1
+    {"section": "meta", "length": 93, "lines": 1}
+    {"parsed_at": "...", "source_file": "..."}
+    {"section": "paragraphs_and_tables", "length": 48211, "lines": 312}
+    {"type": "heading", ...}
+    ...
+
+Readers seek past the sections they do not need, so loading the chunks of a
+document never decodes tables_runs or text_runs_properties. Pretty-printed
+JSON is available as an opt-in debug export (export_pretty_json).
+"""
+
+import os
+import json
+
+MAGIC = b"PSPARSED/1\n"
+PARSED_EXT = "_PARSED.parsed"
+LEGACY_JSON_EXT = "_PARSED.json"
+META_KEYS = ("parsed_at", "source_file")
+
+def parsed_path(parsed_dir, doc_id):
+    return os.path.join(parsed_dir, doc_id + PARSED_EXT)
+
+def legacy_json_path(parsed_dir, doc_id):
+    return os.path.join(parsed_dir, doc_id + LEGACY_JSON_EXT)
+
+def existing_parsed_file(parsed_dir, doc_id):
+    """The compact file if present, else a legacy _PARSED.json, else the compact path (missing)."""
+    path = parsed_path(parsed_dir, doc_id)
+    if os.path.exists(path):
+        return path
+    legacy = legacy_json_path(parsed_dir, doc_id)
+    return legacy if os.path.exists(legacy) else path
+
+def _encode(value):
+    if isinstance(value, list):
+        lines = [json.dumps(item, ensure_ascii=False, separators=(",", ":")) for item in value]
+        return ("\n".join(lines) + "\n" if lines else "").encode("utf-8"), len(lines), "list"
+    return (json.dumps(value, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8"), 1, "value"
+
+def write_parsed(path, parsed):
+    """Writes the parsed dict atomically. Meta keys share one "meta" section."""
+    sections = [("meta", {k: parsed[k] for k in META_KEYS if k in parsed})]
+    sections += [(k, v) for k, v in parsed.items() if k not in META_KEYS]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        for name, value in sections:
+            body, lines, kind = _encode(value)
+            header = {"section": name, "kind": kind, "length": len(body), "lines": lines}
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            f.write(body)
+    os.replace(tmp_path, path)
+    return path
+
+def _decode(header, body):
+    text = body.decode("utf-8")
+    if header.get("kind") == "list":
+        return [json.loads(line) for line in text.splitlines()]
+    return json.loads(text)
+
+def read_parsed(path, sections=None):
+    """
+    Reads a compact parsed file (or a legacy _PARSED.json).
+
+    Args:
+        path (str): File path.
+        sections (Iterable[str], optional): Top-level keys to load; None loads everything.
+            "parsed_at"/"source_file" live in the "meta" section.
+
+    Returns:
+        dict: The requested keys.
+    """
+    wanted = None if sections is None else set(sections)
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            parsed = json.load(f)
+        return parsed if wanted is None else {k: v for k, v in parsed.items() if k in wanted}
+
+    out = {}
+    with open(path, "rb") as f:
+        if f.readline() != MAGIC:
+            raise ValueError(f"{path} is not a compact parsed file")
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            header = json.loads(line)
+            name = header["section"]
+            want = wanted is None or name in wanted or (name == "meta" and wanted & set(META_KEYS))
+            if not want:
+                f.seek(header["length"], os.SEEK_CUR)
+                continue
+            value = _decode(header, f.read(header["length"]))
+            if name == "meta":
+                out.update({k: v for k, v in value.items() if wanted is None or k in wanted})
+            else:
+                out[name] = value
+    return out
+
+def read_section(path, name, default=None):
+    return read_parsed(path, [name]).get(name, default)
+
+def export_pretty_json(parsed, out_path):
+    """Debug export: the whole parsed dict as indented JSON."""
+    with open(out_path, "w", encoding="utf-8") as jf:
+        json.dump(parsed, jf, ensure_ascii=False, indent=2)
+    return out_path
@@ -0,0 +1,344 @@
+"""
+StreamingDocxParser.py
+
+Single-pass DOCX parser. Opens the package once and walks word/document.xml once
+with iterparse, emitting in that one walk everything the three-pass path
+(DocParser.parse_docx + TableNew + ExtractRunPropertiesFromDOCxXML) produced:
+ - paragraphs_and_tables: paragraphs/headings with effective run formatting, then
+   top-level tables as cell-text grids, then embedded files (parse_docx shape)
+ - tables_runs: all tables incl. nested, with run properties (TableNew shape)
+ - text_runs_properties: every text run with its raw XML properties
+
+Each top-level body element is processed when its end tag is seen and then
+dropped from the tree, so memory stays bounded by the largest block rather than
+the whole document. Effective formatting is resolved from word/styles.xml, with
+every style's inherited font properties computed once.
+
+Dependencies:
+ - Python stdlib (zipfile, xml.etree.ElementTree)
+ - python-docx enums only, to report underline values exactly as parse_docx does
+"""
+
+import os
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from docx.enum.text import WD_UNDERLINE
+
+from TableNew import parse_table, NS
+from ExtractRunPropertiesFromDOCxXML import run_text_properties
+from DocParser import FONT_PROPS, merge_fonts
+
+W = NS['w']
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+RT_OFFICE_DOCUMENT = R_NS + '/officeDocument'
+EMBEDDED_RELTYPES = (R_NS + '/oleObject', R_NS + '/package')
+
+ALIGNMENT_NAMES = {
+    'left': 'left',
+    'center': 'center',
+    'right': 'right',
+    'both': 'justify',
+    'distribute': 'distribute',
+}
+
+# python-docx reports these styles by their UI name rather than their styles.xml name
+UI_STYLE_NAMES = {'caption': 'Caption', 'footer': 'Footer', 'header': 'Header'}
+UI_STYLE_NAMES.update({f'heading {n}': f'Heading {n}' for n in range(1, 10)})
+
+# Properties where python-docx's getters treat any falsy value as "not set"
+TRUTHY_PROPS = ('font_name', 'font_size', 'color')
+
+def _q(tag):
+    return f"{{{W}}}{tag}"
+
+def _val(elem):
+    return elem.get(_q('val')) if elem is not None else None
+
+def _on_off(elem):
+    if elem is None:
+        return None
+    val = _val(elem)
+    return val not in ('0', 'false', 'off')
+
+def _underline(elem):
+    if elem is None:
+        return None
+    val = _val(elem)
+    if val is None:
+        return None
+    if val == 'single':
+        return True
+    if val == 'none':
+        return False
+    try:
+        return int(WD_UNDERLINE.from_xml(val))
+    except Exception:
+        return None
+
+def font_properties(rpr):
+    """Direct font properties of a w:rPr element, using python-docx's getter semantics."""
+    props = dict.fromkeys(FONT_PROPS)
+    if rpr is None:
+        return props
+    rfonts = rpr.find('w:rFonts', NS)
+    if rfonts is not None:
+        props['font_name'] = rfonts.get(_q('ascii'))
+    sz = _val(rpr.find('w:sz', NS))
+    if sz:
+        props['font_size'] = int(sz) / 2.0
+    props['bold'] = _on_off(rpr.find('w:b', NS))
+    props['italic'] = _on_off(rpr.find('w:i', NS))
+    props['underline'] = _underline(rpr.find('w:u', NS))
+    color = _val(rpr.find('w:color', NS))
+    if color and color != 'auto':
+        props['color'] = color.upper()
+    return props
+
+def _is_set(prop, value):
+    return bool(value) if prop in TRUTHY_PROPS else value is not None
+
+class StyleSheet:
+    """
+    Style table from word/styles.xml with memoized inheritance.
+
+    resolved(style_id) walks a style's basedOn chain once and caches, per font
+    property, the first value set along it. Precedence is DocParser.merge_fonts,
+    the same rule StyleResolver applies on the python-docx path.
+    """
+
+    def __init__(self, styles_xml=None):
+        self.styles = {}
+        self.defaults = {}
+        self.normal_id = None
+        self._resolved = {}
+        if styles_xml is None:
+            return
+        root = ET.fromstring(styles_xml)
+        for style in root.findall('w:style', NS):
+            style_id = style.get(_q('styleId'))
+            style_type = style.get(_q('type'), 'paragraph')
+            name = _val(style.find('w:name', NS))
+            self.styles[style_id] = {
+                'name': UI_STYLE_NAMES.get(name, name),
+                'type': style_type,
+                'based_on': _val(style.find('w:basedOn', NS)),
+                'font': font_properties(style.find('w:rPr', NS)),
+            }
+            if style.get(_q('default')) in ('1', 'true', 'on'):
+                # python-docx uses the last default declared for a type
+                self.defaults[style_type] = style_id
+            if self.normal_id is None and name == 'Normal':
+                self.normal_id = style_id
+
+    def style_for(self, style_id, style_type):
+        """Mirrors python-docx: unknown or mistyped ids fall back to the type's default style."""
+        style = self.styles.get(style_id)
+        if style is None or style['type'] != style_type:
+            return self.defaults.get(style_type)
+        return style_id
+
+    def name(self, style_id):
+        style = self.styles.get(style_id)
+        return style['name'] if style else None
+
+    def resolved(self, style_id):
+        if style_id not in self._resolved:
+            self._resolved[style_id] = merge_fonts((s['font'] for s in self._chain(style_id)), _is_set)
+        return self._resolved[style_id]
+
+    def _chain(self, style_id):
+        """The style, then its basedOn chain (stopping at a cycle or unknown id)."""
+        seen = set()
+        while style_id in self.styles and style_id not in seen:
+            seen.add(style_id)
+            yield self.styles[style_id]
+            style_id = self.styles[style_id]['based_on']
+
+    def normal_font(self):
+        if self.normal_id is None:
+            return dict.fromkeys(FONT_PROPS)
+        return self.styles[self.normal_id]['font']
+
+    def effective_run_font(self, run_props, run_style_id):
+        """
+        Effective formatting of a run: merge_fonts over direct run formatting, then
+        the run style chain, then the Normal style, as StyleResolver.run_font does.
+        """
+        return merge_fonts((run_props, self.resolved(run_style_id), self.normal_font()), _is_set)
+
+def _run_text(r):
+    parts = []
+    for child in r:
+        if child.tag == _q('t'):
+            parts.append(child.text or '')
+        elif child.tag == _q('tab'):
+            parts.append('\t')
+        elif child.tag in (_q('br'), _q('cr')):
+            parts.append('\n')
+    return ''.join(parts)
+
+def _paragraph_text(p):
+    return ''.join(_run_text(r) for r in p.findall('w:r', NS))
+
+def _paragraph_entry(p, styles):
+    ppr = p.find('w:pPr', NS)
+    pstyle_id = _val(ppr.find('w:pStyle', NS)) if ppr is not None else None
+    jc = _val(ppr.find('w:jc', NS)) if ppr is not None else None
+    para_style_id = styles.style_for(pstyle_id, 'paragraph')
+    style_name = styles.name(para_style_id) or ''
+
+    runs_info = []
+    for r in p.findall('w:r', NS):
+        rpr = r.find('w:rPr', NS)
+        rstyle_id = _val(rpr.find('w:rStyle', NS)) if rpr is not None else None
+        font = styles.effective_run_font(font_properties(rpr), styles.style_for(rstyle_id, 'character'))
+        runs_info.append({
+            'text': _run_text(r),
+            'font_name': font['font_name'],
+            'font_size': font['font_size'],
+            'bold': font['bold'],
+            'italic': font['italic'],
+            'underline': font['underline'],
+            'color': font['color'],
+        })
+    return {
+        'type': 'heading' if style_name.startswith('Heading') else 'paragraph',
+        'text': _paragraph_text(p).strip(),
+        'style': style_name,
+        'alignment': ALIGNMENT_NAMES.get(jc, 'unknown'),
+        'runs': runs_info,
+    }
+
+def _cell_text(tc):
+    return '\n'.join(_paragraph_text(p) for p in tc.findall('w:p', NS))
+
+def _table_grid_text(tbl):
+    """
+    Cell texts per row, laid out the way python-docx's row.cells does: horizontally
+    merged cells repeat across their grid span and vertically merged continuation
+    cells repeat the cell above.
+    """
+    grid = tbl.find('w:tblGrid', NS)
+    col_count = len(grid.findall('w:gridCol', NS)) if grid is not None else 0
+    cells = []
+    for tr in tbl.findall('w:tr', NS):
+        for tc in tr.findall('w:tc', NS):
+            tcpr = tc.find('w:tcPr', NS)
+            span_elem = tcpr.find('w:gridSpan', NS) if tcpr is not None else None
+            span = int(_val(span_elem)) if span_elem is not None and _val(span_elem) else 1
+            vmerge = tcpr.find('w:vMerge', NS) if tcpr is not None else None
+            continues = vmerge is not None and _val(vmerge) in (None, 'continue')
+            for span_idx in range(span):
+                if continues and col_count and len(cells) >= col_count:
+                    cells.append(cells[-col_count])
+                elif span_idx > 0:
+                    cells.append(cells[-1])
+                else:
+                    cells.append(_cell_text(tc))
+    if not col_count:
+        return []
+    return [
+        [text.strip() for text in cells[start:start + col_count]]
+        for start in range(0, len(cells), col_count)
+    ]
+
+def _main_document_part(zf):
+    try:
+        rels = ET.fromstring(zf.read('_rels/.rels'))
+        for rel in rels.findall(f'{{{PKG_REL_NS}}}Relationship'):
+            if rel.get('Type') == RT_OFFICE_DOCUMENT:
+                return rel.get('Target').lstrip('/')
+    except KeyError:
+        pass
+    return 'word/document.xml'
+
+def _embedded_files(zf, part_name):
+    rels_name = posixpath.join(posixpath.dirname(part_name), '_rels', posixpath.basename(part_name) + '.rels')
+    try:
+        rels = ET.fromstring(zf.read(rels_name))
+    except KeyError:
+        return []
+    return [
+        rel.get('Target') for rel in rels.findall(f'{{{PKG_REL_NS}}}Relationship')
+        if rel.get('Type') in EMBEDDED_RELTYPES
+    ]
+
+def parse_docx_single_pass(docx_path):
+    """
+    Parses a .docx in one pass over word/document.xml.
+
+    Args:
+        docx_path (str): Path to .docx file.
+
+    Returns:
+        tuple: (paragraphs_and_tables, tables_runs, text_runs_properties), each in the
+        shape produced by parse_docx, extract_all_tables_with_run_properties and
+        extract_text_properties respectively.
+    """
+    if not os.path.exists(docx_path):
+        raise FileNotFoundError(f"File not found: {docx_path}")
+
+    paragraphs = []
+    tables = []
+    tables_runs = []
+    text_runs_properties = []
+    table_counter = [0]
+
+    with zipfile.ZipFile(docx_path, 'r') as zf:
+        part_name = _main_document_part(zf)
+        try:
+            styles = StyleSheet(zf.read('word/styles.xml'))
+        except KeyError:
+            styles = StyleSheet()
+        embedded_files = _embedded_files(zf, part_name)
+
+        try:
+            doc_xml = zf.open(part_name)
+        except KeyError:
+            raise ValueError(f"The .docx file does not contain {part_name}")
+        with doc_xml:
+            depth = 0
+            body = None
+            for event, elem in ET.iterparse(doc_xml, events=('start', 'end')):
+                if event == 'start':
+                    depth += 1
+                    if depth == 2 and elem.tag == _q('body'):
+                        body = elem
+                    continue
+                depth -= 1
+                if depth != 2 or body is None:
+                    continue
+                # elem is a complete top-level child of w:body
+                for r in elem.iter(_q('r')):
+                    info = run_text_properties(r)
+                    if info is not None:
+                        text_runs_properties.append(info)
+                if elem.tag == _q('p'):
+                    paragraphs.append(_paragraph_entry(elem, styles))
+                elif elem.tag == _q('tbl'):
+                    tables.append(_table_grid_text(elem))
+                    tables_runs.append(parse_table(elem, table_counter))
+                body.remove(elem)
+
+    # parse_docx tags every table with the font name of the last run it resolved
+    last_font_name = None
+    for para in paragraphs:
+        if para['runs']:
+            last_font_name = para['runs'][-1]['font_name']
+
+    paragraphs_and_tables = list(paragraphs)
+    for table_idx, table_data in enumerate(tables):
+        paragraphs_and_tables.append({
+            'font_name': last_font_name,
+            'type': 'table',
+            'table_index': table_idx,
+            'data': table_data
+        })
+    if embedded_files:
+        paragraphs_and_tables.append({
+            'type': 'embedded_files',
+            'files': embedded_files
+        })
+    return paragraphs_and_tables, tables_runs, text_runs_properties
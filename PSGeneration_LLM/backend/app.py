@@ -1,26 +1,47 @@
 import os
-import uuid
 from utils import update_latest_ids
-from flask import Flask, request, jsonify, send_from_directory
+import json
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
-from utils import UPLOAD_DIR, UPDATED_DIR, new_id
+from utils import UPLOAD_DIR, UPDATED_DIR, PARSED_JSON_DIR, new_id
 from docparser_langchain import (
     create_vectorstore,
     find_best_old_mockup_for_new_mockup,
     find_best_ps_for_old_mockup,
+    get_doc_embeddings,
 )
 from updater import update_ps_document_closest
+from ingest import ingest_uploads
+from jobs import make_job_store, JobRunner
+from incremental import match_incrementally, save_run
+from ps_corpus import ps_corpus
+from ParsedStore import parsed_path
 import traceback
 from docparser_langchain import log_chunk_embeddings_and_mappings
 
 app = Flask(__name__)
 CORS(app)
 
-# In-memory dict (for demo; use Redis or DB for prod)
-progress_dict = {}
+# Generation runs in the background; progress and results live in the job store
+# (JOB_STORE=sqlite|memory, see utils.py) so any worker process can answer polls.
+job_store = make_job_store()
+job_runner = JobRunner(job_store)
+JOB_EVENTS_POLL_SECONDS = 1.0
 
-def set_progress(job_id, value, status):
-    progress_dict[job_id] = {'progress': value, 'status': status}
+def add_to_ps_corpus(doc_ids, status_updates):
+    """
+    Adds ingested PS documents to the cross-document corpus index. The corpus is
+    optional, so a failure here is reported in status_updates and logged, never raised:
+    the documents are already parsed and embedded.
+    """
+    try:
+        added = ps_corpus.add_documents(doc_ids)
+        status_updates.append(f"Added {added} chunks to the PS corpus index.")
+    except Exception as e:
+        error_msg = f"PS corpus index not updated: {str(e)}"
+        status_updates.append(error_msg)
+        print(error_msg)
+        print(traceback.format_exc())
 
 @app.route("/upload_ps", methods=["POST"])
 def upload_ps():
@@ -40,9 +61,9 @@ def upload_ps():
         # Parse and vectorize - will auto-save parsed JSON to proper folder
         result = create_vectorstore(doc_id, path, status_updates)
         status_updates.extend(result.get("status_updates", []))
+        add_to_ps_corpus([doc_id], status_updates)
 
-        parsed_json_folder = os.path.join(os.path.dirname(__file__), "DocParser", "ParsedJSON")
-        parsed_json_file = os.path.join(parsed_json_folder, f"{doc_id}_PARSED.json")
+        parsed_json_file = parsed_path(PARSED_JSON_DIR, doc_id)
 
         return jsonify({
             "doc_id": doc_id,
@@ -54,9 +75,6 @@ def upload_ps():
         error_msg = f"Error in upload_ps: {str(e)}"
         tb = traceback.format_exc()
         status_updates.append(error_msg)
-        status_updates.append("Traceback:")
-        for line in tb.splitlines():
-            status_updates.append(line)
         print(error_msg)
         print(tb)
         return jsonify({"error": error_msg, "status_updates": status_updates}), 500
@@ -83,9 +101,6 @@ def upload_old_mock():
         error_msg = f"Error in upload_old_mock: {str(e)}"
         tb = traceback.format_exc()
         status_updates.append(error_msg)
-        status_updates.append("Traceback:")
-        for line in tb.splitlines():
-            status_updates.append(line)
         print(error_msg)
         print(tb)
         return jsonify({"error": error_msg, "status_updates": status_updates}), 500
@@ -111,76 +126,218 @@ def upload_new_mock():
         error_msg = f"Error in upload_new_mock: {str(e)}"
         tb = traceback.format_exc()
         status_updates.append(error_msg)
-        status_updates.append("Traceback:")
-        for line in tb.splitlines():
-            status_updates.append(line)
         print(error_msg)
         print(tb)
         return jsonify({"error": error_msg, "status_updates": status_updates}), 500
 
-@app.route("/generate_new_ps", methods=["POST"])
+@app.route("/ingest_batch", methods=["POST"])
+def ingest_batch():
+    status_updates = []
+    try:
+        files = request.files.getlist("files")
+        if not files:
+            return jsonify({"error": "No files provided"}), 400
+        prefix = request.form.get("prefix", "ps")
+        if prefix not in ("ps", "mock_old", "mock_new"):
+            return jsonify({"error": "prefix must be one of ps, mock_old, mock_new"}), 400
+
+        uploads = []
+        for f in files:
+            doc_id = new_id(prefix)
+            path = os.path.join(UPLOAD_DIR, f"{doc_id}.docx")
+            f.save(path)
+            uploads.append((doc_id, path))
+            status_updates.append(f"File saved for batch ingestion: {f.filename} -> {doc_id}")
+
+        job_id = job_runner.submit(run_ingestion, uploads, prefix)
+        status_updates.append(f"Ingestion queued as job {job_id}.")
+        return jsonify({"job_id": job_id, "status_updates": status_updates}), 202
+    except Exception as e:
+        error_msg = f"Error in ingest_batch: {str(e)}"
+        tb = traceback.format_exc()
+        status_updates.append(error_msg)
+        print(error_msg)
+        print(tb)
+        return jsonify({"error": error_msg, "status_updates": status_updates}), 500
+
+def run_ingestion(job, uploads, prefix):
+    """Runs on the job pool: parse + embed every upload, reporting each document as it finishes."""
+    done = []
+
+    def report(r):
+        done.append(r)
+        job.status_updates.extend(r["status_updates"])
+        job.status_updates.append(f"{r['doc_id']}: {'ingested' if r['ok'] else 'failed'} ({r['chunks']} chunks)")
+        job.set_progress(job.job_id, int(100 * len(done) / len(uploads)), f"Ingested {len(done)} of {len(uploads)} documents...")
+
+    results = ingest_uploads(uploads, on_result=report)
+    if prefix == "ps":
+        # One corpus save for the whole batch (each save rewrites the index).
+        add_to_ps_corpus([r["doc_id"] for r in results if r["ok"]], job.status_updates)
+    return {"results": [{k: v for k, v in r.items() if k != "status_updates"} for r in results]}
+
+@app.route("/match_ps_corpus", methods=["POST"])
+def match_ps_corpus():
+    status_updates = []
+    try:
+        data = request.get_json()
+        mock_id = data.get("mock_id")
+        k = int(data.get("k", 5))
+        chunk_k = int(data.get("chunk_k", 3))
+        if not mock_id:
+            return jsonify({"error": "mock_id required", "status_updates": status_updates}), 400
+
+        mock = get_doc_embeddings(mock_id)
+        result = ps_corpus.match_document(mock.normalized, top_docs=k, chunk_k=chunk_k)
+        status_updates.append(
+            f"Matched {len(mock.matrix)} chunks of {mock_id} against {len(ps_corpus.docs)} PS documents."
+        )
+        return jsonify({"mock_id": mock_id, **result, "status_updates": status_updates})
+    except Exception as e:
+        error_msg = f"Error in match_ps_corpus: {str(e)}"
+        tb = traceback.format_exc()
+        status_updates.append(error_msg)
+        print(error_msg)
+        print(tb)
+        return jsonify({"error": error_msg, "status_updates": status_updates}), 500
+
+def run_generation(job, ps_doc_id, old_mock_id, new_mock_id, similarity_threshold, incremental=False):
+    """Runs on the job pool: matching, then PS update. Returns the job result."""
+    job_id = job.job_id
+    status_updates = job.status_updates
+    set_progress = job.set_progress
+    incremental_stats = None
+
+    if incremental:
+        set_progress(job_id, 10, "Finding best matches for changed chunks...")
+        status_updates.append("Diff-aware generation: reusing matches of unchanged chunks.")
+        new2old_mockup_matches, oldmock2ps_matches, _, incremental_stats = match_incrementally(
+            ps_doc_id, old_mock_id, new_mock_id, status_updates=status_updates
+        )
+    else:
+        set_progress(job_id, 10, "Finding best matches: new mockup to old mockup...")
+        status_updates.append("Finding best matches: new mockup to old mockup.")
+        new2old_mockup_matches, _ = find_best_old_mockup_for_new_mockup(
+            new_mock_id, old_mock_id, status_updates=status_updates
+        )
+        set_progress(job_id, 30, "Finding best matches: old mockup to PS...")
+        status_updates.append("Finding best matches: old mockup to PS.")
+        oldmock2ps_matches, _ = find_best_ps_for_old_mockup(old_mock_id, ps_doc_id, status_updates=status_updates)
+    save_run(ps_doc_id, old_mock_id, new_mock_id, new2old_mockup_matches, oldmock2ps_matches)
+
+    # Chunk/mapping diagnostics (DIAGNOSTICS_LEVEL), written on a background thread
+    log_chunk_embeddings_and_mappings(old_mock_id, new_mock_id, ps_doc_id)
+
+    ps_filename = f"{ps_doc_id}.docx"
+    ps_path = os.path.join(UPLOAD_DIR, ps_filename)
+
+    status_updates.append(f"Generating new PS document using new mockup and mapping via old mockup.")
+    updated_path, update_status = update_ps_document_closest(
+        ps_path,
+        new2old_mockup_matches,
+        oldmock2ps_matches,
+        similarity_threshold=similarity_threshold,
+        job_id=job_id,
+        set_progress=set_progress,
+        status_updates=status_updates
+    )
+
+    if updated_path is None:
+        # The updater reports load/save failures in its status lines rather than raising.
+        raise RuntimeError(update_status[-1] if len(update_status) else "PS update failed")
+
+    out_filename = os.path.basename(updated_path)
+    status_updates.append("Generation complete. Ready for download.")
+    set_progress(job_id, 100, "Generation complete. Ready for download.")
+    return {"updated_file": out_filename, "incremental": incremental_stats}
+
 @app.route("/generate_new_ps", methods=["POST"])
 def generate_new_ps():
-    status_updates = []
-    job_id = str(uuid.uuid4())
     try:
-        set_progress(job_id, 0, "Starting...")
         data = request.get_json()
         ps_doc_id = data.get("ps_doc_id")
         old_mock_id = data.get("old_mock_id")
         new_mock_id = data.get("new_mock_id")
         similarity_threshold = data.get("similarity_threshold", 0.0)
+        incremental = bool(data.get("incremental", False))
 
         if not ps_doc_id or not old_mock_id or not new_mock_id:
-            set_progress(job_id, 100, "Failed: Missing IDs")
-            return jsonify({"error": "ps_doc_id, old_mock_id, new_mock_id required", "status_updates": status_updates, "job_id": job_id}), 400
-
-        set_progress(job_id, 10, "Finding best matches: new mockup to old mockup...")
-        status_updates.append("Finding best matches: new mockup to old mockup.")
-        new2old_mockup_matches, log1 = find_best_old_mockup_for_new_mockup(new_mock_id, old_mock_id)
-        status_updates.extend(log1)
-        set_progress(job_id, 30, "Finding best matches: old mockup to PS...")
-        status_updates.append("Finding best matches: old mockup to PS.")
-        oldmock2ps_matches, log2 = find_best_ps_for_old_mockup(old_mock_id, ps_doc_id)
-        status_updates.extend(log2)
-
-        # === INSERT LOGGING HERE ===
-        log_chunk_embeddings_and_mappings(old_mock_id, new_mock_id, ps_doc_id)
-        # ===========================
-
-        ps_filename = f"{ps_doc_id}.docx"
-        ps_path = os.path.join(UPLOAD_DIR, ps_filename)
-
-        status_updates.append(f"Generating new PS document using new mockup and mapping via old mockup.")
-        updated_path, update_status = update_ps_document_closest(
-            ps_path,
-            new2old_mockup_matches,
-            oldmock2ps_matches,
-            similarity_threshold=similarity_threshold,
-            job_id=job_id,
-            set_progress=set_progress
-        )
-        status_updates.extend(update_status)
+            return jsonify({"error": "ps_doc_id, old_mock_id, new_mock_id required", "status_updates": []}), 400
 
-        out_filename = os.path.basename(updated_path)
-        set_progress(job_id, 100, "Generation complete. Ready for download.")
-        status_updates.append("Generation complete. Ready for download.")
-        return jsonify({"updated_file": out_filename, "status_updates": status_updates, "job_id": job_id})
+        job_id = job_runner.submit(run_generation, ps_doc_id, old_mock_id, new_mock_id, similarity_threshold,
+                                   incremental=incremental)
+        return jsonify({"job_id": job_id, "status_updates": [f"Generation queued as job {job_id}."]}), 202
     except Exception as e:
         error_msg = f"Error in generate_new_ps: {str(e)}"
         tb = traceback.format_exc()
-        status_updates.append(error_msg)
-        status_updates.append("Traceback:")
-        for line in tb.splitlines():
-            status_updates.append(line)
-        set_progress(job_id, 100, "Error: " + error_msg)
         print(error_msg)
         print(tb)
-        return jsonify({"error": error_msg, "status_updates": status_updates, "job_id": job_id}), 500
+        return jsonify({"error": error_msg, "status_updates": [error_msg]}), 500
 
 @app.route("/progress/<job_id>")
 def get_progress(job_id):
-    return jsonify(progress_dict.get(job_id, {'progress': 0, 'status': "Not started"}))
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'progress': 0, 'status': "Not started", 'state': "unknown"})
+    return jsonify({'progress': job["progress"], 'status': job["status"], 'state': job["state"]})
+
+@app.route("/result/<job_id>")
+def get_result(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown or expired job: {job_id}"}), 404
+    response = {
+        "job_id": job_id,
+        "state": job["state"],
+        "status_updates": job["status_updates"],
+        "error": job["error"],
+    }
+    response.update(job["result"] or {})
+    if job["state"] in ("queued", "running"):
+        return jsonify(response), 202
+    return jsonify(response), 500 if job["state"] == "failed" else 200
+
+@app.route("/events/<job_id>")
+def job_events(job_id):
+    """
+    Server-Sent Events stream for a job: "progress" events ({progress, status, state}),
+    one "status" event per status line (id = its sequence number, so a reconnecting
+    EventSource resumes via Last-Event-ID), and a final "done" event with the result.
+    """
+    try:
+        last_seq = int(request.headers.get("Last-Event-ID", -1))
+    except ValueError:
+        last_seq = -1
+
+    def stream():
+        nonlocal last_seq
+        last_progress = None
+        while True:
+            # Read before get(), so an update landing between the two still wakes the wait below.
+            version = job_store.version(job_id)
+            job = job_store.get(job_id)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'error': f'Unknown or expired job: {job_id}'})}\n\n"
+                return
+            first_seq = job.get("status_seq", 0)
+            for offset, line in enumerate(job["status_updates"]):
+                seq = first_seq + offset
+                if seq > last_seq:
+                    yield f"id: {seq}\nevent: status\ndata: {json.dumps(line)}\n\n"
+                    last_seq = seq
+            progress = {"progress": job["progress"], "status": job["status"], "state": job["state"]}
+            if progress != last_progress:
+                yield f"event: progress\ndata: {json.dumps(progress)}\n\n"
+                last_progress = progress
+            if job["state"] in ("done", "failed"):
+                done = {"state": job["state"], "error": job["error"], **(job["result"] or {})}
+                yield f"event: done\ndata: {json.dumps(done)}\n\n"
+                return
+            # Wakes on updates from this process; the timeout catches other workers' writes.
+            job_store.wait(job_id, timeout=JOB_EVENTS_POLL_SECONDS, version=version)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(stream()), mimetype="text/event-stream", headers=headers)
 
 @app.route("/download/<filename>", methods=["GET"])
 def download_file(filename):
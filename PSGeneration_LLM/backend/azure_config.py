@@ -40,7 +40,14 @@ class ConfigAzure:
                 "type": "faiss",
                 "k_results": 5,
                 "similarity_threshold": 0.7,
-                "storage_dir": "vector_storage"
+                "storage_dir": "vector_storage",
+                "index_type": "flat",
+                "min_ann_vectors": 10000,
+                "nlist": None,
+                "nprobe": 16,
+                "hnsw_m": 32,
+                "ef_construction": 200,
+                "ef_search": 128
             },
             "document": {
                 "supported_formats": [".docx", ".pdf", ".xlsx", ".xlsm"],
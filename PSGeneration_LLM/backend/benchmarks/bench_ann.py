@@ -0,0 +1,68 @@
+"""
+bench_ann.py
+
+Exact blocked-matmul matching (matcher.best_matches) versus the approximate
+indexes from faiss_index.build_index (IVF-Flat, HNSW) on unit-normalized
+vectors, as used by match_chunk_embeddings. Reports build time, query time,
+speedup over exact search and recall@1 against the exact best match, for a few
+values of each index's query-time knob (nprobe / ef_search).
+
+Synthetic vectors are drawn around cluster centres so the neighbourhood
+structure resembles real chunk embeddings rather than uniform noise.
+
+Usage:
+    python benchmarks/bench_ann.py --corpus 200000 --queries 2000 --dim 256
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import faiss
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from matcher import best_matches, normalize_rows
+from faiss_index import DEFAULT_INDEX_SETTINGS, build_index, apply_search_params, search_best
+
+def make_vectors(n, dim, clusters, rng):
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, clusters, n)
+    return normalize_rows(centres[labels] + 0.35 * rng.standard_normal((n, dim), dtype=np.float32))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 128, 512])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    corpus = make_vectors(args.corpus, args.dim, args.clusters, rng)
+    queries = make_vectors(args.queries, args.dim, args.clusters, rng)
+
+    t0 = time.perf_counter()
+    exact = np.array([j for j, _ in best_matches(queries, corpus, normalized=True)])
+    exact_s = time.perf_counter() - t0
+    print(f"corpus {args.corpus} x {args.dim}, {args.queries} queries; exact search {exact_s:.3f} s")
+    print(f"{'index':<10} {'knob':>12} {'build (s)':>10} {'query (s)':>10} {'speedup':>8} {'recall@1':>9}")
+
+    for index_type, knob, values in (("ivf_flat", "nprobe", args.nprobe), ("hnsw", "ef_search", args.ef_search)):
+        settings = dict(DEFAULT_INDEX_SETTINGS, index_type=index_type, min_ann_vectors=0)
+        t0 = time.perf_counter()
+        index = build_index(corpus, settings, metric=faiss.METRIC_INNER_PRODUCT)
+        build_s = time.perf_counter() - t0
+        for value in values:
+            apply_search_params(index, dict(settings, **{knob: value}))
+            t0 = time.perf_counter()
+            indices, _ = search_best(index, queries, k=1)
+            query_s = time.perf_counter() - t0
+            recall = float(np.mean(indices[:, 0] == exact))
+            print(f"{index_type:<10} {knob + '=' + str(value):>12} {build_s:>10.2f} {query_s:>10.3f} "
+                  f"{exact_s / query_s:>7.1f}x {recall:>9.3f}")
+
+if __name__ == "__main__":
+    main()
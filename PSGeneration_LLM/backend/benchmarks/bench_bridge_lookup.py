@@ -0,0 +1,85 @@
+"""
+bench_bridge_lookup.py
+
+Compares the original bridge lookup in update_ps_document_closest (for each
+new-mockup chunk, scan old_mockup_to_ps_matches and normalize() both strings on
+every comparison) with updater.BridgeIndex, resolving by text and by old_idx.
+
+Synthetic matches are generated so every new-mockup chunk bridges to a random
+old-mockup chunk. The scan is timed over a sample of new-mockup chunks and
+extrapolated, like bench_matcher.py.
+
+Usage:
+    python benchmarks/bench_bridge_lookup.py --sizes 1000 5000 --sample 200
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from text_index import normalize
+from updater import BridgeIndex
+
+WORDS = "the system shall display a field for user account report status date value total list".split()
+
+def make_matches(n_new, n_old, seed=0):
+    rng = random.Random(seed)
+    old_texts = [f"{i}: " + " ".join(rng.choices(WORDS, k=12)) for i in range(n_old)]
+    old_to_ps = [
+        {"old_idx": i, "old_mockup_chunk": t, "matched_ps_chunk": t, "similarity": 1.0,
+         "ps_metadata": {"section_path": "ROOT", "para_idx": i}}
+        for i, t in enumerate(old_texts)
+    ]
+    new_to_old = []
+    for i in range(n_new):
+        j = rng.randrange(n_old)
+        new_to_old.append({"new_idx": i, "old_idx": j, "similarity": 0.9,
+                           "requirement_chunk": old_texts[j], "matched_old_mockup_chunk": "  " + old_texts[j].upper()})
+    return new_to_old, old_to_ps
+
+def scan_lookup(new_to_old, old_to_ps):
+    """Copy of the original per-chunk linear scan."""
+    resolved = []
+    for m in new_to_old:
+        matched = m.get("matched_old_mockup_chunk", "").strip()
+        found = None
+        for i, om in enumerate(old_to_ps):
+            if normalize(om.get("old_mockup_chunk", "")) == normalize(matched):
+                found = i
+                break
+        resolved.append(found)
+    return resolved
+
+def index_lookup(new_to_old, old_to_ps, by_text=False):
+    bridges = BridgeIndex(old_to_ps)
+    if by_text:
+        return [bridges.by_text.first(m["matched_old_mockup_chunk"]) for m in new_to_old]
+    return [bridges.resolve(m) for m in new_to_old]
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--sample", type=int, default=200, help="new-mockup chunks timed for the scan")
+    args = parser.parse_args()
+
+    print(f"{'n x n':>13} {'scan (s)':>10} {'text idx (s)':>13} {'old_idx (s)':>12} {'speedup':>9} {'agree':>6}")
+    for n in args.sizes:
+        new_to_old, old_to_ps = make_matches(n, n)
+        rows = min(args.sample, n)
+        scan, scan_s = timed(scan_lookup, new_to_old[:rows], old_to_ps)
+        scan_s *= n / rows
+        by_text, text_s = timed(index_lookup, new_to_old, old_to_ps, by_text=True)
+        by_idx, idx_s = timed(index_lookup, new_to_old, old_to_ps)
+        agree = scan == by_text[:rows] == by_idx[:rows]
+        print(f"{n:>6}x{n:<6} {scan_s:>10.3f} {text_s:>13.4f} {idx_s:>12.4f} {scan_s / text_s:>8.0f}x {str(agree):>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+bench_docx_parse.py
+
+Compares the single-pass StreamingDocxParser against the original three-pass path
+(parse_docx + extract_all_tables_with_run_properties + extract_text_properties):
+wall time and peak traced Python memory per document.
+
+Usage:
+    python benchmarks/bench_docx_parse.py [file.docx ...] [--repeat 3]
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "DocParser"))
+from DocParser import parse_docx
+from TableNew import extract_all_tables_with_run_properties
+from ExtractRunPropertiesFromDOCxXML import extract_text_properties
+from StreamingDocxParser import parse_docx_single_pass
+
+DEFAULT_GLOB = os.path.join(os.path.dirname(__file__), "..", "data", "uploads", "*.docx")
+
+def three_pass(path):
+    paragraphs_and_tables = parse_docx(path)
+    tables_runs = extract_all_tables_with_run_properties(path)
+    text_runs_properties = extract_text_properties(path)
+    return paragraphs_and_tables, tables_runs, text_runs_properties
+
+def measure(fn, path, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(path)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    files = args.files or sorted(glob.glob(DEFAULT_GLOB))
+    if not files:
+        print("No .docx files to benchmark.")
+        return
+
+    print(f"{'document':<32} {'3-pass (s)':>11} {'1-pass (s)':>11} {'speedup':>8} {'3-pass MiB':>11} {'1-pass MiB':>11}")
+    for path in files:
+        old_s, old_peak = measure(three_pass, path, args.repeat)
+        new_s, new_peak = measure(parse_docx_single_pass, path, args.repeat)
+        print(f"{os.path.basename(path)[:32]:<32} {old_s:>11.4f} {new_s:>11.4f} {old_s / new_s:>7.1f}x "
+              f"{old_peak / 2**20:>11.2f} {new_peak / 2**20:>11.2f}")
+
+if __name__ == "__main__":
+    main()
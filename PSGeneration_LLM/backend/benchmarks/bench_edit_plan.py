@@ -0,0 +1,114 @@
+"""
+bench_edit_plan.py
+
+Builds a synthetic document, plans thousands of insertions (plus some
+replacements) at random anchors with updater.EditPlan, applies them, and checks
+the resulting paragraph order: every anchor must be followed by its insertions
+in planning order, and replaced anchors must hold their new text. Some anchors
+end a section (w:sectPr in their w:pPr); insertions after them must not add
+section breaks, so the document's w:sectPr count must not change.
+
+For comparison it also times the straightforward per-edit approach (re-read
+doc.paragraphs and shift an offset map after each insertion), which is
+O(edits x paragraphs); that loop is timed over a sample and extrapolated.
+
+Usage:
+    python benchmarks/bench_edit_plan.py --paragraphs 5000 --insertions 5000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from copy import deepcopy
+
+from docx import Document
+from docx.oxml.ns import qn
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from updater import EditPlan
+
+def make_document(n_paragraphs, section_every=500):
+    doc = Document()
+    body_sectPr = doc.element.body.sectPr
+    for i in range(n_paragraphs):
+        p = doc.add_paragraph(f"P{i}")
+        if section_every and (i + 1) % section_every == 0:
+            p._p.get_or_add_pPr().append(deepcopy(body_sectPr))
+    return doc
+
+def section_count(doc):
+    return sum(1 for _ in doc.element.body.iter(qn("w:sectPr")))
+
+def make_edits(n_paragraphs, n_insertions, n_replacements, seed=0):
+    rng = random.Random(seed)
+    insertions = [(rng.randrange(n_paragraphs), f"I{k}") for k in range(n_insertions)]
+    replaced = rng.sample(range(n_paragraphs), min(n_replacements, n_paragraphs))
+    return insertions, {idx: f"R{idx}" for idx in replaced}
+
+def expected_texts(n_paragraphs, insertions, replacements):
+    after = {}
+    for idx, text in insertions:
+        after.setdefault(idx, []).append(text)
+    out = []
+    for i in range(n_paragraphs):
+        out.append(replacements.get(i, f"P{i}"))
+        out.extend(after.get(i, []))
+    return out
+
+def run_plan(doc, insertions, replacements):
+    plan = EditPlan(doc.paragraphs)
+    for idx, text in replacements.items():
+        plan.replace(idx, text)
+    for idx, text in insertions:
+        plan.insert_after(idx, text)
+    plan.apply()
+
+def run_per_edit(doc, insertions):
+    """Per-edit insertion with an explicit offset map, as a correct in-loop version would need."""
+    n = len(doc.paragraphs)
+    position = list(range(n))        # original docx_idx -> current index
+    inserted_after = [0] * n
+    for idx, text in insertions:
+        paragraphs = doc.paragraphs  # rebuilt every edit
+        anchor = paragraphs[position[idx] + inserted_after[idx]]
+        new_p = deepcopy(anchor._p)
+        anchor._p.addnext(new_p)
+        inserted_after[idx] += 1
+        for j in range(idx + 1, n):
+            position[j] += 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=5000)
+    parser.add_argument("--insertions", type=int, default=5000)
+    parser.add_argument("--replacements", type=int, default=500)
+    parser.add_argument("--sample", type=int, default=300, help="edits timed for the per-edit approach")
+    args = parser.parse_args()
+
+    insertions, replacements = make_edits(args.paragraphs, args.insertions, args.replacements)
+
+    doc = make_document(args.paragraphs)
+    sections = section_count(doc)
+    t0 = time.perf_counter()
+    run_plan(doc, insertions, replacements)
+    plan_s = time.perf_counter() - t0
+    ok = [p.text for p in doc.paragraphs] == expected_texts(args.paragraphs, insertions, replacements)
+    sections_ok = section_count(doc) == sections
+
+    doc = make_document(args.paragraphs)
+    rows = min(args.sample, len(insertions))
+    t0 = time.perf_counter()
+    run_per_edit(doc, insertions[:rows])
+    per_edit_s = (time.perf_counter() - t0) * len(insertions) / max(1, rows)
+
+    print(f"{args.paragraphs} paragraphs, {len(insertions)} insertions, {len(replacements)} replacements")
+    print(f"edit plan:  {plan_s:.3f} s  (order correct: {ok}, sections unchanged: {sections_ok})")
+    print(f"per edit:   {per_edit_s:.3f} s  (extrapolated from {rows} edits)")
+    print(f"speedup:    {per_edit_s / plan_s:.0f}x")
+    if not (ok and sections_ok):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+bench_matcher.py
+
+Compares the vectorized matcher (matcher.best_matches) with the original
+per-pair cosine_similarity() double loop used by the find_best_* functions.
+
+The pairwise loop is far too slow to run to completion at 10k+ chunks, so it is
+timed over a sample of query rows and extrapolated to the full size.
+
+Usage:
+    python benchmarks/bench_matcher.py --sizes 1000 10000 50000 --dim 1536
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from matcher import best_matches
+
+def cosine_similarity(vec1, vec2):
+    """Copy of the original per-pair helper from docparser_langchain.py."""
+    if np.linalg.norm(vec1) == 0 or np.linalg.norm(vec2) == 0:
+        return 0.0
+    return float(np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2)))
+
+def loop_best_matches(query, target):
+    results = []
+    for qemb in query:
+        best_sim = -1
+        best_j = None
+        for j, temb in enumerate(target):
+            sim = cosine_similarity(qemb, temb)
+            if sim > best_sim:
+                best_sim = sim
+                best_j = j
+        results.append((best_j, best_sim))
+    return results
+
+def bench_size(n, dim, sample_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    query = rng.standard_normal((n, dim), dtype=np.float32)
+    target = rng.standard_normal((n, dim), dtype=np.float32)
+
+    t0 = time.perf_counter()
+    vec = best_matches(query, target)
+    vec_time = time.perf_counter() - t0
+
+    rows = min(sample_rows, n)
+    query_list = list(query[:rows])
+    target_list = list(target)
+    t0 = time.perf_counter()
+    loop = loop_best_matches(query_list, target_list)
+    loop_sample_time = time.perf_counter() - t0
+    loop_time = loop_sample_time * n / rows
+
+    agree = sum(1 for (a, _), (b, _) in zip(vec[:rows], loop) if a == b) / rows
+    return {
+        "chunks": n,
+        "vectorized_s": vec_time,
+        "loop_s": loop_time,
+        "loop_extrapolated": rows < n,
+        "speedup": loop_time / vec_time if vec_time else float("inf"),
+        "agreement": agree,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--sample-rows", type=int, default=20,
+                        help="query rows timed through the pairwise loop before extrapolating")
+    args = parser.parse_args()
+
+    print(f"{'chunks':>8} {'vectorized (s)':>15} {'loop (s)':>12} {'speedup':>10} {'agree':>7}")
+    for n in args.sizes:
+        r = bench_size(n, args.dim, args.sample_rows)
+        loop_s = f"{r['loop_s']:.2f}" + ("*" if r["loop_extrapolated"] else "")
+        print(f"{r['chunks']:>8} {r['vectorized_s']:>15.3f} {loop_s:>12} {r['speedup']:>9.0f}x {r['agreement']:>7.2f}")
+    print("* extrapolated from --sample-rows query rows")
+
+if __name__ == "__main__":
+    main()
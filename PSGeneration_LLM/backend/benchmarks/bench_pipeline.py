@@ -0,0 +1,213 @@
+"""
+bench_pipeline.py
+
+End-to-end throughput of a generation: parse -> embed -> match -> update, on
+synthetic PS / mockup documents (see synthetic_docx.py), fully offline.
+
+build_vectorstore is given embedding_scheduler.HashEmbeddings (deterministic unit
+vectors, no network) in place of OpenAIEmbeddings, and a throwaway text embedding
+cache so every run embeds from scratch. Stages, in pipeline
+order:
+
+    parse        parse_docx_comprehensively, per document
+    embed        build_vectorstore on the parsed chunks, per document (together
+                 with parse, this is create_vectorstore)
+    match_new    find_best_old_mockup_for_new_mockup
+    match_ps     find_best_ps_for_old_mockup
+    update       update_ps_document_closest
+
+Each stage reports wall time, the peak RSS sampled while it ran, and the RSS
+growth over it. With --repeat N the match and update stages run N more times
+against warm caches, and their best warm time is reported alongside.
+
+Results are printed as a table and written as JSON (--out) with the commit,
+the configuration and the document sizes, so runs are comparable across commits.
+Everything the run writes under data/ is removed afterwards unless --keep.
+
+Usage:
+    python benchmarks/bench_pipeline.py --paragraphs 2000 --out pipeline.json
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import uuid
+import shutil
+import platform
+import resource
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from functools import partial
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from docparser_langchain import (
+    parse_docx_comprehensively,
+    chunks_from_parsed,
+    build_vectorstore,
+    find_best_old_mockup_for_new_mockup,
+    find_best_ps_for_old_mockup,
+    EMBEDDING_MODEL,
+)
+from updater import update_ps_document_closest, generated_output_path
+from embedding_scheduler import HashEmbeddings
+from text_embedding_cache import SQLiteEmbeddingStore
+from embedding_cache import embedding_cache
+from package_cache import package_cache
+from utils import PARSED_JSON_DIR, VECTOR_DIR, EMBED_DIR
+from generate_txt_from_docx import PARSED_OUT_DIR
+from synthetic_docx import make_documents, add_arguments, document_options
+
+def current_rss():
+    """Resident set size in bytes (Linux /proc; elsewhere the process peak so far)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+class RSSSampler:
+    """Polls RSS on a background thread while a stage runs."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.start_rss = current_rss()
+        self.peak = self.start_rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.end_rss = current_rss()
+        self.peak = max(self.peak, self.end_rss)
+
+def timed(stages, name, fn, *args, **kwargs):
+    with RSSSampler() as rss:
+        t0 = time.perf_counter()
+        result = fn(*args, **kwargs)
+        seconds = time.perf_counter() - t0
+    stages.append({
+        "stage": name,
+        "seconds": seconds,
+        "peak_rss_mb": rss.peak / 2**20,
+        "rss_delta_mb": (rss.end_rss - rss.start_rss) / 2**20,
+    })
+    return result
+
+def best_warm(repeat, fn, *args, **kwargs):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args, **kwargs)
+        times.append(time.perf_counter() - t0)
+    return min(times) if times else None
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def cleanup(doc_ids, job_id, ps_path):
+    paths = [generated_output_path(ps_path, job_id),
+             os.path.join(PARSED_OUT_DIR, f"ps_new_chunks_{job_id}_parsedout.txt")]
+    for doc_id in doc_ids:
+        paths += glob.glob(os.path.join(PARSED_JSON_DIR, f"{doc_id}_PARSED.*"))
+        paths += glob.glob(os.path.join(EMBED_DIR, f"{doc_id}.*"))
+        shutil.rmtree(os.path.join(VECTOR_DIR, f"{doc_id}.faiss"), ignore_errors=True)
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+    for doc_id in doc_ids:
+        embedding_cache.invalidate(doc_id)
+        package_cache.invalidate(doc_id)
+
+def print_table(report):
+    print(f"{'stage':<16} {'seconds':>9} {'warm (s)':>9} {'peak RSS MiB':>13} {'RSS delta MiB':>14}")
+    for s in report["stages"]:
+        warm = f"{s['warm_seconds']:.4f}" if s.get("warm_seconds") is not None else "-"
+        print(f"{s['stage']:<16} {s['seconds']:>9.4f} {warm:>9} {s['peak_rss_mb']:>13.1f} {s['rss_delta_mb']:>14.1f}")
+    print(f"{'total':<16} {report['total_seconds']:>9.4f} {'':>9} {report['peak_rss_mb']:>13.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument("--dim", type=int, default=1536, help="embedding dimension of the offline embedder")
+    parser.add_argument("--threshold", type=float, default=0.7, help="similarity_threshold for the update")
+    parser.add_argument("--repeat", type=int, default=0, help="warm re-runs of the match and update stages")
+    parser.add_argument("--out", help="write the JSON report here (default: print it)")
+    parser.add_argument("--keep", action="store_true", help="keep the files written under data/")
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:8]
+    job_id = f"bench{tag}"
+    with tempfile.TemporaryDirectory() as tmp:
+        embedder = HashEmbeddings(args.dim)
+        embedding_store = SQLiteEmbeddingStore(os.path.join(tmp, "embedding_cache.sqlite"))
+        paths = make_documents(tmp, f"bench_{tag}", **document_options(args))
+        doc_ids = {kind: os.path.splitext(os.path.basename(p))[0] for kind, p in paths.items()}
+        documents = {kind: {"doc_id": doc_ids[kind], "bytes": os.path.getsize(p)} for kind, p in paths.items()}
+
+        stages = []
+        try:
+            for kind in ("ps", "old", "new"):
+                parsed = timed(stages, f"parse_{kind}", parse_docx_comprehensively, paths[kind])
+                chunks = chunks_from_parsed(parsed)
+                documents[kind]["chunks"] = len(chunks)
+                timed(stages, f"embed_{kind}", build_vectorstore, doc_ids[kind], chunks,
+                      embedder=embedder, embedding_store=embedding_store)
+
+            new2old, _ = timed(stages, "match_new", find_best_old_mockup_for_new_mockup, doc_ids["new"], doc_ids["old"])
+            stages[-1]["warm_seconds"] = best_warm(args.repeat, find_best_old_mockup_for_new_mockup,
+                                                   doc_ids["new"], doc_ids["old"])
+            old2ps, _ = timed(stages, "match_ps", find_best_ps_for_old_mockup, doc_ids["old"], doc_ids["ps"])
+            stages[-1]["warm_seconds"] = best_warm(args.repeat, find_best_ps_for_old_mockup,
+                                                   doc_ids["old"], doc_ids["ps"])
+            update = partial(update_ps_document_closest, paths["ps"], new2old, old2ps,
+                             similarity_threshold=args.threshold, job_id=job_id)
+            timed(stages, "update", update)
+            stages[-1]["warm_seconds"] = best_warm(args.repeat, update)
+        finally:
+            if not args.keep:
+                cleanup(doc_ids.values(), job_id, paths["ps"])
+
+    report = {
+        "benchmark": "pipeline",
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "embedding_model": EMBEDDING_MODEL,
+        "config": vars(args),
+        "documents": documents,
+        "stages": stages,
+        "total_seconds": sum(s["seconds"] for s in stages),
+        "peak_rss_mb": max(s["peak_rss_mb"] for s in stages),
+    }
+    print_table(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.out}")
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+bench_vector_extraction.py
+
+Micro-benchmark for pulling all vectors out of a FAISS index: the bulk paths in
+faiss_index.extract_vectors (flat storage copy, reconstruct_n) against the
+original one-reconstruct()-per-row loop.
+
+Usage:
+    python benchmarks/bench_vector_extraction.py --sizes 1000 10000 50000 --dim 1536
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import faiss
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from faiss_index import extract_vectors, reconstruct_rows
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'vectors':>8} {'flat copy (s)':>14} {'reconstruct_n (s)':>18} {'per-row (s)':>12} {'speedup':>9}")
+    rng = np.random.default_rng(0)
+    for n in args.sizes:
+        x = rng.standard_normal((n, args.dim), dtype=np.float32)
+        index = faiss.IndexFlatL2(args.dim)
+        index.add(x)
+        ids = sorted(range(n))
+
+        bulk_s, bulk = timed(lambda: extract_vectors(index, ids), args.repeat)
+        rn_s, _ = timed(lambda: index.reconstruct_n(0, n), args.repeat)
+        rows_s, rows = timed(lambda: reconstruct_rows(index, ids), args.repeat)
+        assert np.array_equal(bulk, rows)
+        print(f"{n:>8} {bulk_s:>14.4f} {rn_s:>18.4f} {rows_s:>12.4f} {rows_s / bulk_s:>8.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+synthetic_docx.py
+
+Deterministic synthetic PS / mockup .docx files for the benchmarks.
+
+make_ps builds a PS of headings (levels 1-3), multi-run paragraphs with mixed
+formatting and tables, optionally with a table nested in a cell. make_mockups
+derives an old mockup from it (a share of the PS paragraphs verbatim, the rest
+new text) and a new mockup from the old one (a share of paragraphs reworded,
+plus some insertions), which is the shape of a real generation: most old
+mockup chunks appear in the PS and most new mockup chunks are close to an old
+one.
+
+Usage:
+    python benchmarks/synthetic_docx.py --paragraphs 2000 --out /tmp/synthetic
+"""
+
+import os
+import random
+import argparse
+from docx import Document
+from docx.shared import Pt
+
+WORDS = (
+    "account balance statement payment interest rate service client branch transfer deposit "
+    "withdrawal fee monthly annual notice commitment customer agreement card limit credit debit "
+    "overdraft savings chequing investment mortgage loan term condition privacy policy update "
+    "information important please review contact online banking mobile secure access"
+).split()
+
+def _sentence(rng, min_words=6, max_words=18):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+def _add_runs(paragraph, text, rng, runs_per_paragraph):
+    """Splits text at word boundaries into runs with varied formatting."""
+    words = text.split(" ")
+    n = max(1, min(runs_per_paragraph, len(words)))
+    cuts = sorted(rng.sample(range(1, len(words)), n - 1)) if n > 1 else []
+    bounds = [0] + cuts + [len(words)]
+    for k, (a, b) in enumerate(zip(bounds, bounds[1:])):
+        run = paragraph.add_run(" ".join(words[a:b]) + (" " if b < len(words) else ""))
+        run.bold = k % 3 == 1
+        run.italic = k % 4 == 2
+        if k % 5 == 3:
+            run.font.size = Pt(rng.choice((9, 11, 12)))
+
+def _add_table(container, rng, rows, cols, nested):
+    table = container.add_table(rows=rows, cols=cols)
+    for r, row in enumerate(table.rows):
+        for c, cell in enumerate(row.cells):
+            cell.text = _sentence(rng, 2, 6)
+            if nested and r == 0 and c == 0:
+                _add_table(cell, rng, 2, 2, nested=False)
+    return table
+
+def write_document(path, blocks, runs_per_paragraph=3, seed=0):
+    """
+    Writes blocks to a .docx.
+
+    Args:
+        blocks (List[tuple]): ("heading", text, level), ("paragraph", text) or
+            ("table", rows, cols, nested).
+    """
+    rng = random.Random(seed)
+    doc = Document()
+    for block in blocks:
+        kind = block[0]
+        if kind == "heading":
+            doc.add_heading(block[1], level=block[2])
+        elif kind == "paragraph":
+            _add_runs(doc.add_paragraph(), block[1], rng, runs_per_paragraph)
+        elif kind == "table":
+            _add_table(doc, rng, block[1], block[2], block[3])
+    doc.save(path)
+    return path
+
+def ps_blocks(paragraphs, heading_every=8, table_every=40, table_rows=3, table_cols=3, nested_tables=True, seed=0):
+    """Block list of a synthetic PS with `paragraphs` body paragraphs."""
+    rng = random.Random(seed)
+    blocks = []
+    for i in range(paragraphs):
+        if heading_every and i % heading_every == 0:
+            level = 1 if i % (heading_every * 4) == 0 else rng.choice((2, 3))
+            blocks.append(("heading", _sentence(rng, 2, 5).rstrip("."), level))
+        blocks.append(("paragraph", _sentence(rng)))
+        if table_every and (i + 1) % table_every == 0:
+            blocks.append(("table", table_rows, table_cols, nested_tables))
+    return blocks
+
+def mockup_blocks(ps, overlap=0.8, change_rate=0.2, insert_rate=0.05, seed=0):
+    """
+    Old and new mockup block lists derived from a PS block list.
+
+    Args:
+        overlap (float): Share of old mockup paragraphs copied verbatim from the PS.
+        change_rate (float): Share of new mockup paragraphs reworded from the old mockup.
+        insert_rate (float): New paragraphs inserted into the new mockup, per old paragraph.
+    """
+    rng = random.Random(seed)
+    old = []
+    for block in ps:
+        if block[0] == "paragraph" and rng.random() >= overlap:
+            block = ("paragraph", _sentence(rng))
+        old.append(block)
+    new = []
+    for block in old:
+        if block[0] == "paragraph" and rng.random() < change_rate:
+            words = block[1].rstrip(".").split(" ")
+            for _ in range(max(1, len(words) // 4)):
+                words[rng.randrange(len(words))] = rng.choice(WORDS)
+            block = ("paragraph", " ".join(words) + ".")
+        new.append(block)
+        if block[0] == "paragraph" and rng.random() < insert_rate:
+            new.append(("paragraph", _sentence(rng)))
+    return old, new
+
+def make_documents(out_dir, prefix, paragraphs, runs_per_paragraph=3, heading_every=8, table_every=40,
+                   table_rows=3, table_cols=3, nested_tables=True, overlap=0.8, change_rate=0.2,
+                   insert_rate=0.05, seed=0):
+    """
+    Writes <prefix>_ps.docx, <prefix>_old.docx and <prefix>_new.docx to out_dir.
+
+    Returns:
+        Dict[str, str]: {"ps": path, "old": path, "new": path}
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    ps = ps_blocks(paragraphs, heading_every, table_every, table_rows, table_cols, nested_tables, seed)
+    old, new = mockup_blocks(ps, overlap, change_rate, insert_rate, seed + 1)
+    paths = {}
+    for kind, blocks in (("ps", ps), ("old", old), ("new", new)):
+        path = os.path.join(out_dir, f"{prefix}_{kind}.docx")
+        paths[kind] = write_document(path, blocks, runs_per_paragraph, seed)
+    return paths
+
+def add_arguments(parser):
+    parser.add_argument("--paragraphs", type=int, default=1000, help="body paragraphs in the PS")
+    parser.add_argument("--runs-per-paragraph", type=int, default=3)
+    parser.add_argument("--heading-every", type=int, default=8, help="a heading before every N paragraphs")
+    parser.add_argument("--table-every", type=int, default=40, help="a table after every N paragraphs (0: none)")
+    parser.add_argument("--table-rows", type=int, default=3)
+    parser.add_argument("--table-cols", type=int, default=3)
+    parser.add_argument("--no-nested-tables", dest="nested_tables", action="store_false")
+    parser.add_argument("--overlap", type=float, default=0.8, help="old mockup paragraphs copied from the PS")
+    parser.add_argument("--change-rate", type=float, default=0.2, help="new mockup paragraphs reworded")
+    parser.add_argument("--insert-rate", type=float, default=0.05, help="new mockup paragraphs inserted")
+    parser.add_argument("--seed", type=int, default=0)
+
+def document_options(args):
+    return {
+        "paragraphs": args.paragraphs, "runs_per_paragraph": args.runs_per_paragraph,
+        "heading_every": args.heading_every, "table_every": args.table_every,
+        "table_rows": args.table_rows, "table_cols": args.table_cols, "nested_tables": args.nested_tables,
+        "overlap": args.overlap, "change_rate": args.change_rate, "insert_rate": args.insert_rate,
+        "seed": args.seed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument("--out", default=".", help="output directory")
+    parser.add_argument("--prefix", default="synthetic")
+    args = parser.parse_args()
+    for kind, path in make_documents(args.out, args.prefix, **document_options(args)).items():
+        print(f"{kind:<4} {path} ({os.path.getsize(path)} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -5,23 +5,33 @@ from langchain_community.document_loaders import UnstructuredWordDocumentLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings
-from utils import UPLOAD_DIR, PARSED_JSON_DIR, LATEST_IDS_PATH
+from utils import UPLOAD_DIR, PARSED_JSON_DIR, LATEST_IDS_PATH, DIAGNOSTICS_LEVEL
+from matcher import best_matches
+from faiss_index import extract_vectors, index_settings, uses_ann, build_index, apply_search_params, search_best
+from vector_store import save_embeddings, has_embeddings, manifest_path, load_embedding_matrix
+from embedding_cache import embedding_cache, DocEmbeddings
+from text_embedding_cache import CachedEmbeddings
+from embedding_scheduler import EmbeddingScheduler
+from text_index import normalize, TextIndex, NearDuplicateIndex
+from functools import lru_cache
 import sys
+import logging
 
 
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "DocParser"))
 from CustomDocxParser import parse_docx_comprehensively
+from ParsedStore import parsed_path, existing_parsed_file, read_section
 
 # Import the logging functions for chunk/embedding/mapping logs
-from log_chunk_embeddings_and_mappings import write_old_mockup_log, write_new_mockup_log
+from log_chunk_embeddings_and_mappings import write_old_mockup_log, write_new_mockup_log, diagnostics_enabled, submit
 
 VECTOR_DIR = os.path.join(os.path.dirname(__file__), "data", "vectorstores")
 os.makedirs(VECTOR_DIR, exist_ok=True)
 
-def normalize(text):
-    """Normalize text for matching—strip, collapse spaces, lower-case."""
-    return ' '.join(text.strip().split()).lower()
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+logger = logging.getLogger(__name__)
 
 def load_and_chunk_docx(path, chunk_size=100, chunk_overlap=50, status_updates=None):
     """
@@ -33,14 +43,26 @@ def load_and_chunk_docx(path, chunk_size=100, chunk_overlap=50, status_updates=N
     if status_updates is not None:
         status_updates.append("Parsing document: " + os.path.basename(path))
 
+    # parse_docx_comprehensively also saves the parsed output (ParsedStore format).
     parsed_json = parse_docx_comprehensively(path)
     base = os.path.splitext(os.path.basename(path))[0]
-    out_path = os.path.join(PARSED_JSON_DIR, f"{base}_PARSED.json")
-    with open(out_path, "w", encoding="utf-8") as jf:
-        json.dump(parsed_json, jf, ensure_ascii=False, indent=2)
     if status_updates is not None:
-        status_updates.append(f"Saved full parsed JSON to {out_path}")
+        status_updates.append(f"Saved parsed output to {parsed_path(PARSED_JSON_DIR, base)}")
+
+    chunks = chunks_from_parsed(parsed_json)
+
+    if status_updates is not None:
+        status_updates.append(f"Extracted {len(chunks)} chunks for embedding.")
+
+    return chunks
 
+def chunks_from_parsed(parsed_json):
+    """
+    Builds paragraph and table cell level chunks from a parsed JSON structure.
+
+    Returns:
+        List[dict]: Each dict contains 'text', 'type', and various metadata fields.
+    """
     chunks = []
     # Extract only paragraph/table-level chunks
     for item in parsed_json.get("paragraphs_and_tables", []):
@@ -79,16 +101,16 @@ def load_and_chunk_docx(path, chunk_size=100, chunk_overlap=50, status_updates=N
                             }
                         }
                         chunks.append(chunk)
-
-    if status_updates is not None:
-        status_updates.append(f"Extracted {len(chunks)} chunks for embedding.")
-
     return chunks
 
-def create_vectorstore(doc_id, path, status_updates=None, chunk_size=100, chunk_overlap=50):
+def create_vectorstore(doc_id, path, status_updates=None, chunk_size=100, chunk_overlap=50,
+                       embedder=None, embedding_store=None):
     """
     Creates FAISS vectorstore for a docx document, stores chunk metadata in LangChain format.
 
+    Args:
+        embedder, embedding_store: See build_vectorstore.
+
     Returns:
         Dict: Contains 'status_updates'.
     """
@@ -96,22 +118,63 @@ def create_vectorstore(doc_id, path, status_updates=None, chunk_size=100, chunk_
         status_updates = []
     status_updates.append("Starting vectorstore creation for doc_id: " + doc_id)
     chunks = load_and_chunk_docx(path, chunk_size=chunk_size, chunk_overlap=chunk_overlap, status_updates=status_updates)
+    return build_vectorstore(doc_id, chunks, status_updates, embedder=embedder, embedding_store=embedding_store)
 
+def embedder_model_name(embedder):
+    """Cache namespace for an embedder: its .model if it has one, else its class name."""
+    return getattr(embedder, "model", None) or type(embedder).__name__
+
+def build_vectorstore(doc_id, chunks, status_updates=None, embedder=None, embedding_store=None):
+    """
+    Embeds already-extracted chunks and persists the FAISS vectorstore and memory-mapped embeddings.
+
+    Args:
+        embedder (Embeddings, optional): Embedding backend; defaults to the shared
+            OpenAIEmbeddings client. Vectors are cached under its model name
+            (embedder_model_name), so different embedders never share cache entries.
+        embedding_store (SQLiteEmbeddingStore, optional): Text embedding cache to use
+            instead of the default database.
+
+    Returns:
+        Dict: Contains 'status_updates'.
+    """
+    if status_updates is None:
+        status_updates = []
     docs = []
     for i, chunk in enumerate(chunks):
         chunk['index'] = i
         from langchain.docstore.document import Document as LC_Document
         doc = LC_Document(page_content=chunk["text"], metadata=chunk.get("metadata", {}))
         docs.append(doc)
-    status_updates.append("Creating OpenAI embeddings.")
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+    if embedder is None:
+        embedder, model = get_embeddings_client(), EMBEDDING_MODEL
+    else:
+        model = embedder_model_name(embedder)
+    status_updates.append(f"Creating embeddings ({model}).")
+    scheduler = EmbeddingScheduler(embedder)
+    embeddings = CachedEmbeddings(scheduler, model, store=embedding_store)
     status_updates.append("Generating FAISS vectorstore.")
     vectorstore = FAISS.from_documents(docs, embeddings)
+    status_updates.append(embeddings.stats_message())
+    status_updates.append(scheduler.stats_message())
+    vectors = extract_vectors(vectorstore.index)
+    settings = index_settings()
+    if uses_ann(len(vectors), settings):
+        # Same row positions, so index_to_docstore_id still lines up.
+        vectorstore.index = build_index(vectors, settings)
+        status_updates.append(f"Built {settings['index_type']} index over {len(vectors)} vectors.")
     out_path = os.path.join(VECTOR_DIR, f"{doc_id}.faiss")
     vectorstore.save_local(out_path)
     status_updates.append(f"Vectorstore persisted at {out_path}.")
+    manifest = save_embeddings(doc_id, chunks, vectors)
+    status_updates.append(f"Memory-mapped embeddings persisted at {manifest}.")
     return {"status_updates": status_updates}
 
+@lru_cache(maxsize=1)
+def get_embeddings_client():
+    """Shared OpenAIEmbeddings client; constructing one per load is wasted work."""
+    return OpenAIEmbeddings(model=EMBEDDING_MODEL)
+
 def load_vectorstore(doc_id, status_updates=None):
     """
     Loads an existing FAISS vectorstore for a doc_id.
@@ -119,100 +182,143 @@ def load_vectorstore(doc_id, status_updates=None):
     Returns:
         FAISS vectorstore object.
     """
-    from langchain_openai import OpenAIEmbeddings
-    from langchain_community.vectorstores import FAISS
     if status_updates is not None:
         status_updates.append(f"Loading vectorstore for doc_id: {doc_id}.")
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
     path = os.path.join(VECTOR_DIR, f"{doc_id}.faiss")
-    vs = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+    vs = FAISS.load_local(path, get_embeddings_client(), allow_dangerous_deserialization=True)
+    apply_search_params(vs.index, index_settings())
     if status_updates is not None:
         status_updates.append(f"Loaded vectorstore for {doc_id}.")
     return vs
 
-def build_mo_to_ps_exact_mapping(mockup_chunks, ps_chunks):
+def build_mo_to_ps_exact_mapping(mockup_chunks, ps_chunks, near_duplicate_threshold=None):
     """
     Map each chunk in mockup_original to its exact text match in psdocx_original.
 
+    Texts are compared after normalize(); a duplicated PS text maps to its first
+    occurrence. With near_duplicate_threshold set, mockup chunks without an exact
+    match fall back to the most similar PS chunk by word-shingle Jaccard (MinHash/LSH
+    candidates) at or above that threshold.
+
     Returns:
         Dict: {MO_chunk_index: PS_chunk_index, ...}
     """
+    ps_index = TextIndex(c['text'] for c in ps_chunks)
+    near_index = None
     chunk_map = {}
-    normalized_ps = [normalize(c['text']) for c in ps_chunks]
-    print("Normalized Old PS Chunks:")
-    for idx, nps in enumerate(normalized_ps):
-        print(f"{idx}: {repr(nps)}")
+    near = 0
     for i, mo in enumerate(mockup_chunks):
-        mo_norm = normalize(mo['text'])
-        print(f"\nMockup chunk {i}: {repr(mo_norm)}")
-        found = False
-        for j, ps_norm in enumerate(normalized_ps):
-            if mo_norm == ps_norm:
-                print(f" --> MATCHES PS chunk {j}")
-                chunk_map[i] = j
-                found = True
-                break
-        if not found:
-            print(" --> No match in PS")
+        j = ps_index.first(mo['text'])
+        if j is not None:
+            chunk_map[i] = j
+            logger.debug("Mockup chunk %d matches PS chunk %d", i, j)
+            continue
+        if near_duplicate_threshold is not None:
+            if near_index is None:
+                near_index = NearDuplicateIndex((c['text'] for c in ps_chunks), threshold=near_duplicate_threshold)
+            hit = near_index.best(mo['text'])
+            if hit is not None:
+                chunk_map[i] = hit[0]
+                near += 1
+                logger.debug("Mockup chunk %d near-matches PS chunk %d (jaccard %.3f)", i, hit[0], hit[1])
+                continue
+        logger.debug("Mockup chunk %d: no match in PS: %r", i, normalize(mo['text']))
+    logger.debug("Exact mapping: %d of %d mockup chunks mapped to %d PS chunks (%d near-duplicate)",
+                 len(chunk_map), len(mockup_chunks), len(ps_chunks), near)
     return chunk_map
+
 def get_all_chunks(doc_id):
     """
-    Loads all chunks from parsed JSON for a doc.
+    Loads all chunks from a doc's parsed output; only the paragraphs_and_tables
+    section is read.
 
     Returns:
         List[dict]: Each dict represents a chunk.
     """
-    base = os.path.join(PARSED_JSON_DIR, f"{doc_id}_PARSED.json")
-    with open(base, "r", encoding="utf-8") as f:
-        parsed = json.load(f)
-    return [item for item in parsed.get("paragraphs_and_tables", []) if item.get("text", "").strip()]
+    items = read_section(existing_parsed_file(PARSED_JSON_DIR, doc_id), "paragraphs_and_tables", [])
+    return [item for item in items if item.get("text", "").strip()]
 
-def get_all_embeddings(doc_id):
+def _load_vectorstore_embeddings(doc_id):
     """
-    Loads all embeddings for a doc_id from the FAISS vectorstore.
+    Extracts every vector of a doc_id's FAISS vectorstore, in index order.
 
     Returns:
-        List[np.ndarray]: Embeddings for each chunk in order.
+        np.ndarray: (n, d) float32 matrix.
     """
-    embeddings = []
     vs = load_vectorstore(doc_id)
     # For newer langchain/faiss: index_to_docstore_id is a dict: {index: docstore_id}
     # For older: index_to_docstore_id may be a list; handle both for robustness
     index_to_docstore_id = vs.index_to_docstore_id
-
-    # If it's a dict, sort by index (key)
     if isinstance(index_to_docstore_id, dict):
-        for idx in sorted(index_to_docstore_id.keys()):
-            emb = vs.index.reconstruct(idx)
-            embeddings.append(emb)
+        ids = sorted(index_to_docstore_id.keys())
     else:  # fallback for old style list
-        for idx, key in enumerate(index_to_docstore_id):
-            emb = vs.index.reconstruct(idx)
-            embeddings.append(emb)
-    return embeddings
+        ids = list(range(len(index_to_docstore_id)))
+    return extract_vectors(vs.index, ids)
+
+def get_doc_embeddings(doc_id):
+    """
+    Returns the chunks and embedding matrix of a doc_id from the process-wide cache,
+    loading them only on a miss or after they change on disk.
+
+    The memory-mapped store written by create_vectorstore is preferred; documents
+    ingested before it existed fall back to the pickled FAISS vectorstore.
+
+    Returns:
+        DocEmbeddings: .chunks, .matrix (float32) and .normalized (unit rows).
+    """
+    parsed_file = existing_parsed_file(PARSED_JSON_DIR, doc_id)
+    if has_embeddings(doc_id):
+        sources = [parsed_file, manifest_path(doc_id)]
+        load_matrix = lambda: load_embedding_matrix(doc_id)
+    else:
+        sources = [parsed_file, os.path.join(VECTOR_DIR, f"{doc_id}.faiss", "index.faiss")]
+        load_matrix = lambda: _load_vectorstore_embeddings(doc_id)
+    return embedding_cache.get(
+        doc_id, sources,
+        lambda: DocEmbeddings(doc_id, get_all_chunks(doc_id), load_matrix())
+    )
+
+def get_all_embeddings(doc_id):
+    """
+    Loads all embeddings for a doc_id.
+
+    Returns:
+        np.ndarray: (n, d) float32 matrix, one row per chunk in order.
+    """
+    return get_doc_embeddings(doc_id).matrix
+
+def _write_chunk_logs(old_mockup_id, new_mockup_id, ps_doc_id, with_embeddings):
+    old_mockup = get_doc_embeddings(old_mockup_id)
+    new_mockup = get_doc_embeddings(new_mockup_id)
+    ps_chunks = get_doc_embeddings(ps_doc_id).chunks
+    chunk_map = build_mo_to_ps_exact_mapping(old_mockup.chunks, ps_chunks)
+    write_old_mockup_log(old_mockup.chunks, old_mockup.matrix, ps_chunks, chunk_map, with_embeddings=with_embeddings)
+    write_new_mockup_log(new_mockup.chunks, new_mockup.matrix, with_embeddings=with_embeddings)
 
 def log_chunk_embeddings_and_mappings(
-    old_mockup_id, new_mockup_id, ps_doc_id
+    old_mockup_id, new_mockup_id, ps_doc_id, level=DIAGNOSTICS_LEVEL, background=True
 ):
     """
     Main integration function to perform logging after all chunking/embedding/mapping.
 
-    Writes:
-        - Old Mockup chunk/embedding/mapping log
-        - New Mockup chunk/embedding log
+    Writes (see log_chunk_embeddings_and_mappings.py):
+        - Old Mockup chunk/mapping log (+ embeddings at level "full")
+        - New Mockup chunk log (+ embeddings at level "full")
+
+    Args:
+        level (str): "off" | "basic" | "full"; defaults to DIAGNOSTICS_LEVEL.
+        background (bool): Write on the diagnostics thread instead of the caller's.
+
+    Returns:
+        Future or None: The pending write when run in the background, else None.
     """
-    # 1. Get chunks
-    old_mockup_chunks = get_all_chunks(old_mockup_id)
-    new_mockup_chunks = get_all_chunks(new_mockup_id)
-    ps_chunks = get_all_chunks(ps_doc_id)
-    # 2. Get embeddings
-    old_mockup_embeddings = get_all_embeddings(old_mockup_id)
-    new_mockup_embeddings = get_all_embeddings(new_mockup_id)
-    # 3. Build mapping
-    chunk_map = build_mo_to_ps_exact_mapping(old_mockup_chunks, ps_chunks)
-    # 4. Write logs
-    write_old_mockup_log(old_mockup_chunks, old_mockup_embeddings, ps_chunks, chunk_map)
-    write_new_mockup_log(new_mockup_chunks, new_mockup_embeddings)
+    if not diagnostics_enabled(level):
+        return None
+    args = (old_mockup_id, new_mockup_id, ps_doc_id, level == "full")
+    if background:
+        return submit(_write_chunk_logs, *args)
+    _write_chunk_logs(*args)
+    return None
 
 ########################
 # BEST MATCHING UTILS  #
@@ -224,65 +330,162 @@ def cosine_similarity(vec1, vec2):
         return 0.0
     return float(np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2)))
 
-def find_best_old_mockup_for_new_mockup(new_mock_id, old_mock_id, similarity_threshold=0.0):
+def match_chunk_embeddings(src, tgt, rows=None):
+    """
+    Shared matching engine for the find_best_* functions.
+
+    Uses the cached, already-normalized float32 matrices of both documents and resolves
+    the best target for every source chunk with blocked matrix multiplies, or with the
+    configured ANN index (vectorstore.index_type) once the target is large enough.
+
+    Args:
+        src (DocEmbeddings): Source document.
+        tgt (DocEmbeddings): Target document.
+        rows (List[int], optional): Only match these source chunks.
+
+    Returns:
+        List[Tuple[int, int or None, float]]: (src_idx, tgt_idx, similarity) per source chunk.
+    """
+    n = min(len(src.chunks), len(src.matrix))
+    if rows is None:
+        rows = range(n)
+        query = src.normalized[:n]
+    else:
+        rows = [i for i in rows if i < n]
+        query = src.normalized[rows]
+    settings = index_settings()
+    if uses_ann(len(tgt.matrix), settings):
+        indices, sims = search_best(tgt.ann_index(settings), query, k=1)
+        best = [(int(j), float(s)) if j >= 0 else (None, -1.0) for j, s in zip(indices[:, 0], sims[:, 0])]
+    else:
+        best = best_matches(query, tgt.normalized, normalized=True)
+    return [(i, j, sim) for i, (j, sim) in zip(rows, best)]
+
+def match_chunks(src, tgt, rows=None, exact_first=True):
     """
-    For each chunk in new mockup, find the best matching chunk (by embedding similarity) in old mockup.
+    Two-tier matching: source chunks whose normalized text appears verbatim in the
+    target are resolved by a hash lookup (first occurrence, similarity 1.0, no vector
+    math); only the remaining chunks go through match_chunk_embeddings.
+
+    Args:
+        src (DocEmbeddings): Source document.
+        tgt (DocEmbeddings): Target document.
+        rows (List[int], optional): Only match these source chunks.
+        exact_first (bool): False sends every chunk to embedding matching.
 
     Returns:
-        matches: List[dict] -- Each dict: {"new_idx": int, "old_idx": int, "similarity": float}
-        logs: List[str]
+        results (List[Tuple[int, int or None, float]]): As match_chunk_embeddings, in row order.
+        exact_count (int): Chunks resolved by the text lookup.
+    """
+    if not exact_first:
+        return match_chunk_embeddings(src, tgt, rows=rows), 0
+    n = min(len(src.chunks), len(src.matrix))
+    candidates = range(n) if rows is None else [i for i in rows if i < n]
+    m = len(tgt.matrix)
+    exact = {}
+    for i in candidates:
+        j = tgt.text_index.first(src.chunks[i].get("text", ""))
+        if j is not None and j < m:
+            exact[i] = j
+    if not exact:
+        return match_chunk_embeddings(src, tgt, rows=rows), 0
+    residue = [i for i in candidates if i not in exact]
+    embedded = {i: (i, j, sim) for i, j, sim in match_chunk_embeddings(src, tgt, rows=residue)} if residue else {}
+    return [(i, exact[i], 1.0) if i in exact else embedded[i] for i in candidates], len(exact)
+
+def _short_circuit_log(label, exact_count, total):
+    share = 100.0 * exact_count / total if total else 0.0
+    return (f"Exact-match short-circuit: {exact_count} of {total} {label} chunks ({share:.1f}%) "
+            f"resolved by text, {total - exact_count} sent to embedding matching.")
+
+def _chunk_text(doc, idx):
+    if idx is None or idx >= len(doc.chunks):
+        return ""
+    return doc.chunks[idx].get("text", "")
+
+def _chunk_metadata(doc, idx):
+    if idx is None or idx >= len(doc.chunks):
+        return {}
+    chunk = doc.chunks[idx]
+    return {
+        "section_path": chunk.get("section_path", ""),
+        "para_idx": chunk.get("para_idx", 0),
+        "type": chunk.get("type"),
+        "style": chunk.get("style"),
+    }
+
+def find_best_old_mockup_for_new_mockup(new_mock_id, old_mock_id, similarity_threshold=0.0, new_indices=None,
+                                        exact_first=True, status_updates=None):
     """
-    logs = []
-    new_chunks = get_all_chunks(new_mock_id)
-    old_chunks = get_all_chunks(old_mock_id)
-    new_embs = get_all_embeddings(new_mock_id)
-    old_embs = get_all_embeddings(old_mock_id)
+    For each chunk in new mockup (or only those in new_indices), find the best matching
+    chunk in old mockup: verbatim text matches first, embedding similarity for the rest
+    (see match_chunks).
 
+    Raises:
+        ValueError: If new_indices holds an index outside the new mockup's embedded chunks
+            (e.g. a stale incremental run record), instead of returning a partial match set.
+
+    Returns:
+        matches: List[dict] -- Each dict: {"new_idx": int, "old_idx": int, "similarity": float,
+                 "requirement_chunk": str, "matched_old_mockup_chunk": str}
+        logs: List[str] -- status_updates itself when given (lines are appended as they happen)
+    """
+    logs = [] if status_updates is None else status_updates
+    new_mock = get_doc_embeddings(new_mock_id)
+    old_mock = get_doc_embeddings(old_mock_id)
+    if new_indices is not None:
+        n = min(len(new_mock.chunks), len(new_mock.matrix))
+        invalid = [i for i in new_indices if not 0 <= i < n]
+        if invalid:
+            raise ValueError(f"new_indices out of range for {new_mock_id} ({n} embedded chunks): "
+                             f"{invalid[:10]}{' ...' if len(invalid) > 10 else ''}")
+
+    results, exact_count = match_chunks(new_mock, old_mock, rows=new_indices, exact_first=exact_first)
+    logs.append(_short_circuit_log("new mockup", exact_count, len(results)))
     matches = []
-    for i, (nchunk, nemb) in enumerate(zip(new_chunks, new_embs)):
-        best_sim = -1
-        best_j = None
-        for j, oemb in enumerate(old_embs):
-            sim = cosine_similarity(nemb, oemb)
-            if sim > best_sim:
-                best_sim = sim
-                best_j = j
+    for i, best_j, best_sim in results:
         if best_sim >= similarity_threshold:
-            matches.append({"new_idx": i, "old_idx": best_j, "similarity": best_sim})
+            matches.append({"new_idx": i, "old_idx": best_j, "similarity": best_sim,
+                            "requirement_chunk": _chunk_text(new_mock, i),
+                            "matched_old_mockup_chunk": _chunk_text(old_mock, best_j)})
             logs.append(f"New chunk {i} best matches old chunk {best_j} (sim={best_sim:.4f})")
         else:
-            matches.append({"new_idx": i, "old_idx": None, "similarity": best_sim})
+            matches.append({"new_idx": i, "old_idx": None, "similarity": best_sim,
+                            "requirement_chunk": _chunk_text(new_mock, i),
+                            "matched_old_mockup_chunk": ""})
             logs.append(f"New chunk {i} has no match above threshold, best sim={best_sim:.4f}")
     return matches, logs
 
-def find_best_ps_for_old_mockup(old_mock_id, ps_doc_id, similarity_threshold=0.0):
+def find_best_ps_for_old_mockup(old_mock_id, ps_doc_id, similarity_threshold=0.0, exact_first=True,
+                                status_updates=None):
     """
-    For each chunk in old mockup, find the best matching chunk (by embedding similarity) in PS.
+    For each chunk in old mockup, find the best matching chunk in PS: verbatim text
+    matches first, embedding similarity for the rest (see match_chunks).
 
     Returns:
-        matches: List[dict] -- Each dict: {"old_idx": int, "ps_idx": int, "similarity": float}
-        logs: List[str]
+        matches: List[dict] -- Each dict: {"old_idx": int, "ps_idx": int, "similarity": float,
+                 "old_mockup_chunk": str, "matched_ps_chunk": str, "ps_metadata": dict}
+        logs: List[str] -- status_updates itself when given (lines are appended as they happen)
     """
-    logs = []
-    old_chunks = get_all_chunks(old_mock_id)
-    ps_chunks = get_all_chunks(ps_doc_id)
-    old_embs = get_all_embeddings(old_mock_id)
-    ps_embs = get_all_embeddings(ps_doc_id)
+    logs = [] if status_updates is None else status_updates
+    old_mock = get_doc_embeddings(old_mock_id)
+    ps_doc = get_doc_embeddings(ps_doc_id)
 
+    results, exact_count = match_chunks(old_mock, ps_doc, exact_first=exact_first)
+    logs.append(_short_circuit_log("old mockup", exact_count, len(results)))
     matches = []
-    for i, (ochunk, oemb) in enumerate(zip(old_chunks, old_embs)):
-        best_sim = -1
-        best_j = None
-        for j, pemb in enumerate(ps_embs):
-            sim = cosine_similarity(oemb, pemb)
-            if sim > best_sim:
-                best_sim = sim
-                best_j = j
+    for i, best_j, best_sim in results:
         if best_sim >= similarity_threshold:
-            matches.append({"old_idx": i, "ps_idx": best_j, "similarity": best_sim})
+            matches.append({"old_idx": i, "ps_idx": best_j, "similarity": best_sim,
+                            "old_mockup_chunk": _chunk_text(old_mock, i),
+                            "matched_ps_chunk": _chunk_text(ps_doc, best_j),
+                            "ps_metadata": _chunk_metadata(ps_doc, best_j)})
             logs.append(f"Old chunk {i} best matches PS chunk {best_j} (sim={best_sim:.4f})")
         else:
-            matches.append({"old_idx": i, "ps_idx": None, "similarity": best_sim})
+            matches.append({"old_idx": i, "ps_idx": None, "similarity": best_sim,
+                            "old_mockup_chunk": _chunk_text(old_mock, i),
+                            "matched_ps_chunk": "",
+                            "ps_metadata": {}})
             logs.append(f"Old chunk {i} has no match above threshold, best sim={best_sim:.4f}")
     return matches, logs
 
@@ -312,4 +515,4 @@ if __name__ == "__main__":
             f"Please upload all required documents via the API."
         )
     print(f"Using IDs: old_mockup_id={old_mockup_id}, new_mockup_id={new_mockup_id}, ps_doc_id={ps_doc_id}")
-    log_chunk_embeddings_and_mappings(old_mockup_id, new_mockup_id, ps_doc_id)
\ No newline at end of file
+    log_chunk_embeddings_and_mappings(old_mockup_id, new_mockup_id, ps_doc_id, level="full", background=False)
@@ -0,0 +1,121 @@
+"""
+embedding_cache.py
+
+Process-wide LRU cache of per-document embedding matrices.
+
+Each entry holds a document's chunk list together with its reconstructed float32
+embedding matrix, keyed by doc_id and the modification times of the files it was
+built from. A re-upload or rebuild changes the mtime and the stale entry is
+replaced on next access. Entries are evicted least-recently-used first once the
+total matrix size exceeds the configured memory budget.
+"""
+
+import os
+import threading
+import logging
+from collections import OrderedDict
+
+from matcher import normalize_rows
+from faiss_index import build_index, index_nbytes
+from text_index import TextIndex
+import faiss
+from utils import EMBED_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+class DocEmbeddings:
+    """
+    Chunks and embedding matrix for one document, with a lazily normalized copy, a
+    lazily built normalized-text index of the chunks and, when matching is configured
+    for approximate search, a lazily built ANN index.
+    """
+
+    def __init__(self, doc_id, chunks, matrix):
+        self.doc_id = doc_id
+        self.chunks = chunks
+        self.matrix = matrix
+        self._normalized = None
+        self._text_index = None
+        self._ann_indexes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def normalized(self):
+        if self._normalized is None:
+            self._normalized = normalize_rows(self.matrix)
+        return self._normalized
+
+    @property
+    def text_index(self):
+        if self._text_index is None:
+            self._text_index = TextIndex(c.get("text", "") for c in self.chunks)
+        return self._text_index
+
+    def ann_index(self, settings):
+        """Inner-product index over the normalized rows (cosine), built once per settings."""
+        key = tuple(sorted(settings.items()))
+        with self._lock:
+            if key not in self._ann_indexes:
+                self._ann_indexes[key] = build_index(self.normalized, settings, metric=faiss.METRIC_INNER_PRODUCT)
+            return self._ann_indexes[key]
+
+    @property
+    def nbytes(self):
+        # Budget for the normalized copy up front so lazily creating it never overshoots;
+        # ANN indexes are counted once built and taken into account at the next eviction.
+        return 2 * int(self.matrix.nbytes) + sum(index_nbytes(i) for i in self._ann_indexes.values())
+
+class EmbeddingCache:
+    def __init__(self, max_bytes=EMBED_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # doc_id -> (key, DocEmbeddings)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def total_bytes(self):
+        return sum(entry.nbytes for _, entry in self._entries.values())
+
+    def get(self, doc_id, source_paths, loader):
+        """
+        Return the cached DocEmbeddings for doc_id, calling loader() on a miss.
+
+        Args:
+            doc_id (str): Document identifier.
+            source_paths (List[str]): Files the entry is built from; their mtimes form the cache key.
+            loader (callable): Returns a fresh DocEmbeddings.
+        """
+        key = tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in source_paths)
+        with self._lock:
+            cached = self._entries.get(doc_id)
+            if cached is not None and cached[0] == key:
+                self._entries.move_to_end(doc_id)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        entry = loader()
+
+        with self._lock:
+            self._entries[doc_id] = (key, entry)
+            self._entries.move_to_end(doc_id)
+            self._evict()
+        return entry
+
+    def invalidate(self, doc_id=None):
+        with self._lock:
+            if doc_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(doc_id, None)
+
+    def _evict(self):
+        total = self.total_bytes
+        # Always keep the most recent entry, even if it alone exceeds the budget.
+        while total > self.max_bytes and len(self._entries) > 1:
+            doc_id, (_, entry) = self._entries.popitem(last=False)
+            total -= entry.nbytes
+            logger.info(f"Evicted embeddings for {doc_id} from cache ({entry.nbytes} bytes)")
+
+embedding_cache = EmbeddingCache()
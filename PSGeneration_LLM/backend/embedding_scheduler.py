@@ -0,0 +1,147 @@
+"""
+embedding_scheduler.py
+
+Batched, concurrent embedding with rate-limit-aware retries.
+
+EmbeddingScheduler wraps any LangChain-style embedder (an object with
+embed_documents(texts) -> List[List[float]]). Texts are packed into batches under
+a token budget, a bounded number of batches run concurrently in a thread pool,
+and batches that hit HTTP 429 are retried with exponential backoff (honouring
+Retry-After when the backend sends it). Output order always matches input order.
+
+HashEmbeddings is a deterministic, offline stand-in embedder for tests and
+benchmarks.
+"""
+
+import time
+import random
+import threading
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_TOKENS = 20000
+DEFAULT_MAX_BATCH_SIZE = 512
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_RETRIES = 6
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+def is_rate_limit_error(exc):
+    if type(exc).__name__ == "RateLimitError":
+        return True
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429
+
+def retry_after_seconds(exc):
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def pack_batches(texts, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+    """
+    Groups text positions into batches whose estimated token total stays under
+    max_batch_tokens. A single text larger than the budget gets a batch of its own.
+
+    Returns:
+        List[List[int]]: Positions into texts, in order.
+    """
+    batches = []
+    current, current_tokens = [], 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (current_tokens + tokens > max_batch_tokens or len(current) >= max_batch_size):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+class EmbeddingScheduler(Embeddings):
+    def __init__(self, embedder, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_workers=DEFAULT_MAX_WORKERS, max_retries=DEFAULT_MAX_RETRIES, base_delay=1.0, max_delay=60.0,
+                 sleep=time.sleep):
+        self.embedder = embedder
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.stats = {"chunks": 0, "batches": 0, "retries": 0, "seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _embed_batch(self, texts):
+        attempt = 0
+        while True:
+            try:
+                return self.embedder.embed_documents(texts)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                    raise
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = min(self.max_delay, self.base_delay * (2 ** attempt)) * (0.5 + random.random() / 2)
+                attempt += 1
+                with self._stats_lock:
+                    self.stats["retries"] += 1
+                logger.warning(f"Embedding batch rate limited, retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                self.sleep(delay)
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        start = time.perf_counter()
+        batches = pack_batches(texts, self.max_batch_tokens, self.max_batch_size)
+        results = [None] * len(texts)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [(batch, pool.submit(self._embed_batch, [texts[i] for i in batch])) for batch in batches]
+            for batch, future in futures:
+                for i, vec in zip(batch, future.result()):
+                    results[i] = vec
+        with self._stats_lock:
+            self.stats["chunks"] += len(texts)
+            self.stats["batches"] += len(batches)
+            self.stats["seconds"] += time.perf_counter() - start
+        return results
+
+    def embed_query(self, text):
+        return self.embedder.embed_query(text)
+
+    @property
+    def chunks_per_sec(self):
+        seconds = self.stats["seconds"]
+        return self.stats["chunks"] / seconds if seconds else 0.0
+
+    def stats_message(self):
+        return (
+            f"Embedded {self.stats['chunks']} chunks in {self.stats['batches']} batches "
+            f"({self.chunks_per_sec:.1f} chunks/sec, {self.stats['retries']} rate-limit retries)."
+        )
+
+class HashEmbeddings(Embeddings):
+    """Deterministic offline embedder: each text maps to a fixed unit vector seeded by its hash."""
+
+    def __init__(self, dim=1536):
+        self.dim = dim
+
+    def _embed(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vec = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return (vec / np.linalg.norm(vec)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
@@ -0,0 +1,175 @@
+"""
+faiss_index.py
+
+Helpers for working with raw FAISS indexes underneath the LangChain vectorstores:
+bulk vector extraction, and building/tuning the approximate (IVF-Flat, HNSW)
+indexes selected by the "vectorstore" section of ConfigAzure.
+"""
+
+import os
+import numpy as np
+import faiss
+from functools import lru_cache
+
+def _flat_vectors(index):
+    """
+    Zero-copy (n, d) view of a flat index's storage, or None if the index is not flat.
+    The view is only valid while the index is alive.
+    """
+    flat = faiss.downcast_index(index)
+    if not isinstance(flat, faiss.IndexFlat):
+        return None
+    n, d = flat.ntotal, flat.d
+    if hasattr(flat, "get_xb"):
+        return faiss.rev_swig_ptr(flat.get_xb(), n * d).reshape(n, d)
+    # faiss < 1.7.3 keeps the vectors in a std::vector<float> member
+    return faiss.vector_to_array(flat.xb).reshape(n, d)
+
+def reconstruct_rows(index, ids):
+    """Row-by-row fallback: one index.reconstruct() call per id."""
+    out = np.empty((len(ids), index.d), dtype=np.float32)
+    for row, idx in enumerate(ids):
+        out[row] = index.reconstruct(int(idx))
+    return out
+
+def extract_vectors(index, ids=None):
+    """
+    Pulls stored vectors out of a FAISS index as one (n, d) float32 array.
+
+    Flat indexes are copied straight out of their storage in one block; other index
+    types try reconstruct_n() (IVF indexes get a direct map first), and fall back to
+    per-row reconstruct() when that is not supported.
+
+    Args:
+        index: faiss.Index
+        ids (List[int], optional): Positions to extract, in output order. Defaults to
+            all positions 0..ntotal-1; the bulk paths are only taken for that default.
+
+    Returns:
+        np.ndarray: float32 (n, d) array owned by the caller.
+    """
+    n = index.ntotal
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.no():
+        ivf.make_direct_map()
+    if ids is not None and not (len(ids) == n and all(i == pos for pos, i in enumerate(ids))):
+        return reconstruct_rows(index, ids)
+    if n == 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+
+    view = _flat_vectors(index)
+    if view is not None:
+        return np.array(view, dtype=np.float32, copy=True)
+    try:
+        return np.ascontiguousarray(index.reconstruct_n(0, n), dtype=np.float32)
+    except RuntimeError:
+        return reconstruct_rows(index, range(n))
+
+CONFIG_AZURE_PATH = os.path.join(os.path.dirname(__file__), "config_azure.json")
+
+# Index types accepted in the "vectorstore" section of ConfigAzure ("index_type").
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw")
+
+DEFAULT_INDEX_SETTINGS = {
+    "index_type": "flat",
+    "min_ann_vectors": 10000,  # smaller collections always use exact (flat) search
+    "nlist": None,             # IVF cells; None = 4 * sqrt(n), capped so each cell gets >= 39 training points
+    "nprobe": 16,              # IVF cells visited per query (recall/latency knob)
+    "hnsw_m": 32,              # HNSW graph degree
+    "ef_construction": 200,    # HNSW build-time beam width
+    "ef_search": 128,          # HNSW query-time beam width (recall/latency knob)
+}
+
+@lru_cache(maxsize=1)
+def index_settings():
+    """
+    DEFAULT_INDEX_SETTINGS overlaid with the "vectorstore" section of ConfigAzure.
+
+    azure_config is imported here, on first use, and only when config_azure.json
+    exists: loading it prints and reconfigures SSL for the whole process, and
+    without the file it would only return these defaults anyway.
+    """
+    if not os.path.exists(CONFIG_AZURE_PATH):
+        return dict(DEFAULT_INDEX_SETTINGS)
+    from azure_config import config_azure
+    settings = dict(DEFAULT_INDEX_SETTINGS)
+    settings.update({k: v for k, v in (config_azure.get("vectorstore", default={}) or {}).items()
+                     if k in DEFAULT_INDEX_SETTINGS})
+    if settings["index_type"] not in INDEX_TYPES:
+        raise ValueError(f"Unknown vectorstore index_type '{settings['index_type']}' (expected one of {INDEX_TYPES})")
+    return settings
+
+def uses_ann(n, settings):
+    return settings["index_type"] != "flat" and n >= settings["min_ann_vectors"]
+
+def ivf_nlist(n, settings):
+    if settings.get("nlist"):
+        return int(settings["nlist"])
+    return max(1, min(int(4 * np.sqrt(n)), n // 39))
+
+def build_index(vectors, settings, metric=faiss.METRIC_L2):
+    """
+    Builds the configured index type over vectors (float32, (n, d)). Positions in the
+    index are the row numbers, as with a flat index, so LangChain's
+    index_to_docstore_id mapping stays valid when the index is swapped in.
+
+    Args:
+        vectors (np.ndarray): (n, d) float32.
+        settings (dict): See DEFAULT_INDEX_SETTINGS.
+        metric: faiss.METRIC_L2 (LangChain's default) or faiss.METRIC_INNER_PRODUCT
+            (cosine on unit-normalized rows).
+
+    Returns:
+        faiss.Index
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, d = vectors.shape
+    index_type = settings["index_type"] if uses_ann(n, settings) else "flat"
+    if index_type == "ivf_flat":
+        quantizer = faiss.IndexFlat(d, metric)
+        index = faiss.IndexIVFFlat(quantizer, d, ivf_nlist(n, settings), metric)
+        index.train(vectors)
+        index.add(vectors)
+        # The index owns its quantizer from here on.
+        index.own_fields = True
+        quantizer.this.disown()
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, int(settings["hnsw_m"]), metric)
+        index.hnsw.efConstruction = int(settings["ef_construction"])
+        index.add(vectors)
+    else:
+        index = faiss.IndexFlat(d, metric)
+        index.add(vectors)
+    apply_search_params(index, settings)
+    return index
+
+def apply_search_params(index, settings):
+    """Sets the query-time recall/latency knobs (nprobe / efSearch); they are not all persisted."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(int(settings["nprobe"]), ivf.nlist)
+    hnsw = faiss.downcast_index(index)
+    if isinstance(hnsw, faiss.IndexHNSW):
+        hnsw.hnsw.efSearch = int(settings["ef_search"])
+    return index
+
+def index_nbytes(index):
+    """Approximate resident size: stored vectors plus per-type overhead (ids, graph links)."""
+    n, d = index.ntotal, index.d
+    size = n * d * 4
+    if faiss.try_extract_index_ivf(index) is not None:
+        size += n * 8
+    elif isinstance(faiss.downcast_index(index), faiss.IndexHNSW):
+        size += n * int(faiss.downcast_index(index).hnsw.nb_neighbors(0)) * 4
+    return size
+
+def search_best(index, query, k=1):
+    """
+    Top-k search returning (indices, scores) of shape (m, k). Missing results
+    (fewer than k reachable vectors) come back as index -1.
+    """
+    query = np.ascontiguousarray(query, dtype=np.float32)
+    if len(query) == 0:
+        return np.zeros((0, k), dtype=np.int64), np.zeros((0, k), dtype=np.float32)
+    scores, indices = index.search(query, k)
+    return indices, scores
@@ -0,0 +1,153 @@
+"""
+incremental.py
+
+Diff-aware regeneration.
+
+After every generation the matches are saved as a run record for the
+(PS, old mockup) pair in data/runs/<ps_doc_id>__<old_mock_id>.json, together
+with a content hash of each new-mockup chunk. A later generation against the
+same pair with incremental=True:
+ - reuses the stored old mockup -> PS matches outright (neither document changed),
+ - reuses the stored new -> old mockup match of every new-mockup chunk whose
+   text hash was already seen in the previous run,
+ - sends only the changed chunks through embedding matching.
+The updater still plans every chunk, since the output is rebuilt from the
+original PS, but planning and applying are linear and cheap next to matching.
+"""
+
+import os
+import json
+from datetime import datetime
+
+from utils import RUNS_DIR
+from text_embedding_cache import content_key
+from docparser_langchain import (
+    EMBEDDING_MODEL,
+    get_all_chunks,
+    find_best_old_mockup_for_new_mockup,
+    find_best_ps_for_old_mockup,
+)
+
+def run_record_path(ps_doc_id, old_mock_id):
+    return os.path.join(RUNS_DIR, f"{ps_doc_id}__{old_mock_id}.json")
+
+def chunk_hashes(chunks, model=EMBEDDING_MODEL):
+    return [content_key(model, c.get("text", "")) for c in chunks]
+
+def load_run(ps_doc_id, old_mock_id):
+    """The last run record for the pair, or None."""
+    path = run_record_path(ps_doc_id, old_mock_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_run(ps_doc_id, old_mock_id, new_mock_id, new2old_matches, oldmock2ps_matches, new_chunks=None):
+    """Writes the run record for the pair (atomically, replacing the previous one)."""
+    if new_chunks is None:
+        new_chunks = get_all_chunks(new_mock_id)
+    record = {
+        "ps_doc_id": ps_doc_id,
+        "old_mock_id": old_mock_id,
+        "new_mock_id": new_mock_id,
+        "model": EMBEDDING_MODEL,
+        "saved_at": datetime.utcnow().isoformat(),
+        "new_chunk_hashes": chunk_hashes(new_chunks),
+        "new2old_matches": new2old_matches,
+        "oldmock2ps_matches": oldmock2ps_matches,
+    }
+    path = run_record_path(ps_doc_id, old_mock_id)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    os.replace(tmp_path, path)
+    return path
+
+def diff_chunks(previous, hashes):
+    """
+    Splits the new mockup's chunks into reusable and changed ones.
+
+    Args:
+        previous (dict): Run record from load_run.
+        hashes (List[str]): chunk_hashes of the new mockup.
+
+    Returns:
+        reused (Dict[int, dict]): new_idx -> previous match for a chunk with the same text.
+            Duplicated texts reuse the match of their first occurrence.
+        changed (List[int]): new_idx of chunks that need matching.
+    """
+    prev_matches = {m.get("new_idx"): m for m in previous.get("new2old_matches", [])}
+    by_hash = {}
+    for i, h in enumerate(previous.get("new_chunk_hashes", [])):
+        if i in prev_matches:
+            by_hash.setdefault(h, prev_matches[i])
+    reused, changed = {}, []
+    for i, h in enumerate(hashes):
+        if h in by_hash:
+            reused[i] = by_hash[h]
+        else:
+            changed.append(i)
+    return reused, changed
+
+def match_incrementally(ps_doc_id, old_mock_id, new_mock_id, similarity_threshold=0.0, status_updates=None):
+    """
+    Drop-in for the two find_best_* calls of a generation, reusing the previous run's
+    matches where the inputs did not change. Falls back to full matching when there
+    is no usable previous run.
+
+    status_updates (list-like, optional) receives the log lines as they happen and is
+    returned as logs.
+
+    Returns:
+        new2old_matches, oldmock2ps_matches (same shapes as find_best_*), logs (List[str]),
+        stats (dict): chunks, reused_matches, matched_chunks, reused_ps_matches, previous_new_mock_id
+    """
+    logs = [] if status_updates is None else status_updates
+    new_chunks = get_all_chunks(new_mock_id)
+    hashes = chunk_hashes(new_chunks)
+    previous = load_run(ps_doc_id, old_mock_id)
+    if previous is not None and previous.get("model") != EMBEDDING_MODEL:
+        logs.append(f"Previous run used embedding model {previous.get('model')}; matching everything.")
+        previous = None
+
+    if previous is None:
+        logs.append("No previous run for this PS and old mockup; matching all chunks.")
+        reused, changed = {}, list(range(len(new_chunks)))
+        oldmock2ps_matches, _ = find_best_ps_for_old_mockup(old_mock_id, ps_doc_id, status_updates=logs)
+    else:
+        reused, changed = diff_chunks(previous, hashes)
+        oldmock2ps_matches = previous["oldmock2ps_matches"]
+        logs.append(f"Reusing {len(oldmock2ps_matches)} old mockup to PS matches from the previous run "
+                    f"(new mockup {previous.get('new_mock_id')}).")
+
+    matched = {}
+    if changed:
+        changed_matches, _ = find_best_old_mockup_for_new_mockup(
+            new_mock_id, old_mock_id, similarity_threshold=similarity_threshold, new_indices=changed,
+            status_updates=logs
+        )
+        matched = {m["new_idx"]: m for m in changed_matches}
+
+    new2old_matches = []
+    for i, chunk in enumerate(new_chunks):
+        if i in reused:
+            m = dict(reused[i])
+            m["new_idx"] = i
+            m["requirement_chunk"] = chunk.get("text", "")
+            new2old_matches.append(m)
+        elif i in matched:
+            new2old_matches.append(matched[i])
+
+    stats = {
+        "chunks": len(new_chunks),
+        "reused_matches": len(reused),
+        "matched_chunks": len(changed),
+        "reused_ps_matches": previous is not None,
+        "previous_new_mock_id": previous.get("new_mock_id") if previous else None,
+    }
+    logs.append(
+        f"Incremental matching: {stats['reused_matches']} of {stats['chunks']} new mockup chunks unchanged "
+        f"(matches reused), {stats['matched_chunks']} re-matched"
+        + ("; old mockup to PS matching skipped." if previous is not None else ".")
+    )
+    return new2old_matches, oldmock2ps_matches, logs, stats
@@ -0,0 +1,127 @@
+"""
+ingest.py
+
+Batch ingestion of many .docx files.
+
+Parsing (CPU-bound pure Python) is fanned out across a ProcessPoolExecutor. As
+each document finishes parsing, its chunks go straight into the embedding stage
+in the parent process while the remaining documents are still being parsed.
+Workers are started with "spawn", not fork: ingestion also runs on a job thread
+inside the multithreaded server, and forking there could copy locks held by
+other threads (job pool, caches, SQLite handles) into the children.
+Outputs land in the usual places: data/uploads/<doc_id>.docx,
+DocParser/ParsedJSON/<doc_id>_PARSED.parsed and the vectorstore/embedding dirs.
+
+Usage:
+    python ingest.py --prefix ps --workers 8 path/to/*.docx path/to/folder
+"""
+
+import os
+import glob
+import shutil
+import argparse
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils import UPLOAD_DIR, new_id
+from docparser_langchain import load_and_chunk_docx, build_vectorstore
+
+MP_START_METHOD = "spawn"
+
+def _parse_worker(doc_id, path):
+    """Runs in a worker process: parse, save parsed JSON, return chunks."""
+    status_updates = []
+    chunks = load_and_chunk_docx(path, status_updates=status_updates)
+    return doc_id, chunks, status_updates
+
+def ingest_uploads(uploads, max_workers=None, on_result=None, start_method=MP_START_METHOD):
+    """
+    Parses and embeds documents already saved under their doc_id.
+
+    Args:
+        uploads (List[Tuple[str, str]]): (doc_id, path) pairs.
+        max_workers (int, optional): Parser processes; defaults to the CPU count.
+        on_result (callable, optional): Called with each per-document result as it completes.
+        start_method (str): multiprocessing start method for the parser processes.
+
+    Returns:
+        List[dict]: One result per document, in completion order:
+            {"doc_id", "path", "ok", "chunks", "status_updates"[, "error"]}
+    """
+    results = []
+    paths = dict(uploads)
+    mp_context = multiprocessing.get_context(start_method)
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as pool:
+        futures = {pool.submit(_parse_worker, doc_id, path): doc_id for doc_id, path in uploads}
+        for future in as_completed(futures):
+            doc_id = futures[future]
+            result = {"doc_id": doc_id, "path": paths[doc_id], "ok": False, "chunks": 0, "status_updates": []}
+            try:
+                _, chunks, status_updates = future.result()
+                result["status_updates"] = status_updates
+                result["chunks"] = len(chunks)
+                build_vectorstore(doc_id, chunks, status_updates)
+                result["ok"] = True
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+                result["status_updates"].append(f"Error ingesting {doc_id}: {e}")
+                print(traceback.format_exc())
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    return results
+
+def ingest_documents(paths, prefix="ps", max_workers=None, on_result=None):
+    """
+    Copies each .docx into UPLOAD_DIR under a fresh doc_id, then ingests them all.
+
+    Args:
+        paths (List[str]): .docx files.
+        prefix (str): doc_id prefix, as used by the upload endpoints ("ps", "mock_old", "mock_new").
+
+    Returns:
+        List[dict]: See ingest_uploads; each result also carries "source" (the original path).
+    """
+    uploads = []
+    sources = {}
+    for path in paths:
+        doc_id = new_id(prefix)
+        dest = os.path.join(UPLOAD_DIR, f"{doc_id}.docx")
+        shutil.copyfile(path, dest)
+        uploads.append((doc_id, dest))
+        sources[doc_id] = path
+    results = ingest_uploads(uploads, max_workers=max_workers, on_result=on_result)
+    for result in results:
+        result["source"] = sources[result["doc_id"]]
+    return results
+
+def expand_paths(args):
+    paths = []
+    for arg in args:
+        if os.path.isdir(arg):
+            paths.extend(sorted(glob.glob(os.path.join(arg, "*.docx"))))
+        else:
+            paths.extend(sorted(glob.glob(arg)) or [arg])
+    return [p for p in paths if not os.path.basename(p).startswith("~$")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-ingest .docx files (parse + embed).")
+    parser.add_argument("paths", nargs="+", help=".docx files, globs or directories")
+    parser.add_argument("--prefix", default="ps", choices=["ps", "mock_old", "mock_new"])
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    args = parser.parse_args()
+
+    paths = expand_paths(args.paths)
+    print(f"Ingesting {len(paths)} documents with prefix '{args.prefix}'.")
+
+    def report(result):
+        state = "ok" if result["ok"] else f"FAILED ({result['error']})"
+        print(f"{result['doc_id']}: {result['chunks']} chunks, {state}")
+
+    results = ingest_documents(paths, prefix=args.prefix, max_workers=args.workers, on_result=report)
+    failed = [r for r in results if not r["ok"]]
+    print(f"Done: {len(results) - len(failed)} ingested, {len(failed)} failed.")
+
+if __name__ == "__main__":
+    main()
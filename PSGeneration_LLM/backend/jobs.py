@@ -0,0 +1,323 @@
+"""
+jobs.py
+
+Background job execution with a pluggable progress/result store.
+
+JobRunner runs submitted functions on a bounded thread pool and records each
+job's state, progress, status line, status log and final result in a job store.
+Two stores are provided behind the same interface:
+ - InMemoryJobStore: process-local dict (single-process dev server)
+ - SQLiteJobStore: one SQLite file shared by every worker process on the host
+Records expire TTL seconds after their last update.
+
+The status log is a bounded ring buffer (JOB_STATUS_BUFFER lines). Every line
+has a sequence number: the record keeps the buffered lines in "status_updates"
+and the sequence number of the first one in "status_seq", so a streaming
+reader can resume after the last line it saw. Stores' wait() blocks until a
+job changes in this process, or until the timeout for changes made elsewhere.
+All of a running job's writes go through its JobContext.publish, one at a time,
+so a late status flush never overwrites the final record.
+"""
+
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import logging
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import JOB_STORE, JOB_STORE_DB, JOB_TTL_SECONDS, JOB_WORKERS, JOB_STATUS_BUFFER
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL_SECONDS = 60
+# Status lines are written to the store at most this often (progress changes always are).
+STATUS_FLUSH_SECONDS = 0.25
+
+def new_job_record(job_id):
+    now = time.time()
+    return {
+        "job_id": job_id,
+        "state": "queued",
+        "progress": 0,
+        "status": "Queued",
+        "status_updates": [],
+        "status_seq": 0,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+class _ChangeNotifier:
+    """Lets readers block until a job is updated by this process."""
+
+    def __init__(self):
+        self._changed = threading.Condition()
+        self._versions = {}
+
+    def notify(self, job_id):
+        with self._changed:
+            self._versions[job_id] = self._versions.get(job_id, 0) + 1
+            self._changed.notify_all()
+
+    def version(self, job_id):
+        """Change counter for job_id; read it before get() and pass it to wait()."""
+        with self._changed:
+            return self._versions.get(job_id, 0)
+
+    def wait(self, job_id, timeout, version=None):
+        """
+        Blocks until job_id changes after `version` (default: now), or timeout.
+
+        Passing the version read before a get() closes the gap between the two: an
+        update landing in between returns immediately instead of after the timeout.
+        """
+        with self._changed:
+            if version is None:
+                version = self._versions.get(job_id, 0)
+            self._changed.wait_for(lambda: self._versions.get(job_id, 0) != version, timeout)
+
+    def forget(self, job_id):
+        with self._changed:
+            self._versions.pop(job_id, None)
+
+class InMemoryJobStore(_ChangeNotifier):
+    def __init__(self, ttl=JOB_TTL_SECONDS):
+        super().__init__()
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def create(self, job_id):
+        with self._lock:
+            self._jobs[job_id] = new_job_record(job_id)
+            self._purge()
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            record = self._jobs.setdefault(job_id, new_job_record(job_id))
+            record.update(fields)
+            record["updated_at"] = time.time()
+        self.notify(job_id)
+
+    def get(self, job_id):
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is None or record["updated_at"] + self.ttl < time.time():
+                return None
+            return dict(record)
+
+    def _purge(self):
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        expired = [k for k, r in self._jobs.items() if r["updated_at"] + self.ttl < now]
+        for k in expired:
+            del self._jobs[k]
+            self.forget(k)
+
+class SQLiteJobStore(_ChangeNotifier):
+    def __init__(self, path=JOB_STORE_DB, ttl=JOB_TTL_SECONDS):
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _write(self, conn, record):
+        conn.execute(
+            "INSERT OR REPLACE INTO jobs (job_id, data, updated_at) VALUES (?, ?, ?)",
+            (record["job_id"], json.dumps(record), record["updated_at"]),
+        )
+
+    def create(self, job_id):
+        with self._lock, self._connect() as conn:
+            self._write(conn, new_job_record(job_id))
+            self._purge(conn)
+
+    def update(self, job_id, **fields):
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            record = json.loads(row[0]) if row else new_job_record(job_id)
+            record.update(fields)
+            record["updated_at"] = time.time()
+            self._write(conn, record)
+        self.notify(job_id)
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM jobs WHERE job_id = ? AND updated_at >= ?", (job_id, time.time() - self.ttl)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _purge(self, conn):
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        conn.execute("DELETE FROM jobs WHERE updated_at < ?", (now - self.ttl,))
+
+def make_job_store(kind=JOB_STORE):
+    if kind == "memory":
+        return InMemoryJobStore()
+    if kind == "sqlite":
+        return SQLiteJobStore()
+    raise ValueError(f"Unknown job store '{kind}' (expected 'memory' or 'sqlite')")
+
+class StatusLog:
+    """
+    Job status lines in a bounded ring buffer. Supports the list operations the
+    pipeline uses on status_updates (append, extend, iteration, indexing).
+    """
+
+    def __init__(self, maxlen=JOB_STATUS_BUFFER, on_change=None):
+        self._lines = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.total = 0
+        self.on_change = on_change
+
+    def append(self, line):
+        with self._lock:
+            self._lines.append(str(line))
+            self.total += 1
+        if self.on_change is not None:
+            self.on_change()
+
+    def extend(self, lines):
+        with self._lock:
+            for line in lines:
+                self._lines.append(str(line))
+                self.total += 1
+        if self.on_change is not None:
+            self.on_change()
+
+    @property
+    def first_seq(self):
+        with self._lock:
+            return self.total - len(self._lines)
+
+    def snapshot(self):
+        """(first_seq, lines) read together, so sequence numbers always match the lines."""
+        with self._lock:
+            return self.total - len(self._lines), list(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines)
+
+    def __getitem__(self, index):
+        return self._lines[index]
+
+    def __len__(self):
+        return len(self._lines)
+
+class JobContext:
+    """
+    Handed to a running job so it can report progress and status lines.
+
+    Status lines are published at most every STATUS_FLUSH_SECONDS; lines that
+    arrive sooner are flushed by a timer, so they never wait on the next append
+    while the job is busy. Every store write snapshots the log and updates the
+    record under one lock (publish), and finish() writes the final record under
+    it too, so no flush can land after it.
+    """
+
+    def __init__(self, store, job_id):
+        self.store = store
+        self.job_id = job_id
+        self.status_updates = StatusLog(on_change=self._status_changed)
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._timer = None
+        self._finished = False
+
+    def log_fields(self):
+        first_seq, lines = self.status_updates.snapshot()
+        return {"status_updates": lines, "status_seq": first_seq}
+
+    def publish(self, **fields):
+        """Writes fields plus the current status log to the store; False once finished."""
+        with self._publish_lock:
+            if self._finished:
+                return False
+            with self._lock:
+                self._last_flush = time.monotonic()
+            self.store.update(self.job_id, **fields, **self.log_fields())
+            return True
+
+    def _flush(self):
+        with self._lock:
+            self._timer = None
+        self.publish()
+
+    def _status_changed(self):
+        with self._lock:
+            wait = STATUS_FLUSH_SECONDS - (time.monotonic() - self._last_flush)
+            if wait > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(wait, self._flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self._flush()
+
+    def set_progress(self, job_id, value, status):
+        # Same signature as the set_progress callbacks the pipeline already accepts.
+        # The status log collected so far is published alongside each progress step.
+        self.publish(progress=value, status=status)
+
+    def finish(self, **fields):
+        """
+        Writes the final record (with the whole log) and stops publishing. Waits for a
+        flush in progress; a pending or later flush is dropped.
+        """
+        with self._publish_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            self._finished = True
+            self.store.update(self.job_id, **fields, **self.log_fields())
+
+class JobRunner:
+    def __init__(self, store, max_workers=JOB_WORKERS):
+        self.store = store
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queues fn(job, *args, **kwargs) and returns its job_id immediately.
+        fn's return value becomes the job's result; an exception marks it failed.
+        """
+        job_id = str(uuid.uuid4())
+        self.store.create(job_id)
+        self._pool.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, fn, args, kwargs):
+        job = JobContext(self.store, job_id)
+        self.store.update(job_id, state="running", status="Starting...")
+        try:
+            result = fn(job, *args, **kwargs)
+            job.finish(state="done", progress=100, result=result)
+        except Exception as e:
+            # The traceback goes to the server log only, never into the status stream.
+            error_msg = f"{type(e).__name__}: {e}"
+            logger.error(f"Job {job_id} failed: {error_msg}\n{traceback.format_exc()}")
+            job.status_updates.append(f"Error: {error_msg}")
+            job.finish(state="failed", progress=100, status="Error: " + error_msg, error=error_msg)
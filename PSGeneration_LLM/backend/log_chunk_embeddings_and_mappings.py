@@ -1,94 +1,151 @@
+"""
+log_chunk_embeddings_and_mappings.py
+
+Diagnostic dumps of the chunks, embeddings and old mockup -> PS mapping of a
+generation, written to data/ParsedData:
+
+    old_mockup_chunks_log.jsonl  header line, then one line per old mockup chunk:
+                                 {"idx", "text", "chars", "ps_idx", "ps_text"}
+    new_mockup_chunks_log.jsonl  header line, then {"idx", "text", "chars"} per chunk
+    *.npy                        float32 embedding matrix (row i = chunk i), only at
+                                 DIAGNOSTICS_LEVEL "full"; the header names the file
+
+Output is linear in the number of chunks. How much is written is controlled by
+DIAGNOSTICS_LEVEL (utils.py): "off" skips the dumps entirely, "basic" writes the
+JSONL files, "full" adds the embedding sidecars. Writes run on a single background
+thread (submit) so they stay off the request path and never interleave.
+"""
+
 import os
 import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
+from utils import DIAGNOSTICS_LEVEL
+
+logger = logging.getLogger(__name__)
+
 # Directory to store logs
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data", "ParsedData")
 os.makedirs(DATA_DIR, exist_ok=True)
 
+DIAGNOSTICS_LEVELS = ("off", "basic", "full")
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="diagnostics")
+
+def _write_jsonl(out_path, header, rows):
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, out_path)
+    return out_path
+
+def _write_embeddings(out_path, embeddings, n):
+    """Saves the first n rows as a float32 .npy next to the log; returns its file name."""
+    matrix = np.asarray(embeddings, dtype=np.float32)[:n]
+    tmp_path = out_path + ".tmp.npy"
+    np.save(tmp_path, matrix)
+    os.replace(tmp_path, out_path)
+    return os.path.basename(out_path)
+
 def write_old_mockup_log(
-    old_mockup_chunks, 
+    old_mockup_chunks,
     old_mockup_embeddings,
     ps_chunks,
     chunk_map,
-    out_filename="old_mockup_chunks_log.txt"
+    out_filename="old_mockup_chunks_log.jsonl",
+    with_embeddings=True
 ):
     """
     Logs all chunks of Old Mockup, their embeddings, and mapping with Old PS.
 
     Args:
         old_mockup_chunks (list): List of dicts, each chunk from Old Mockup
-        old_mockup_embeddings (list): List of vectors (np.ndarray or list), each embedding for old mockup chunk
+        old_mockup_embeddings (np.ndarray or list): One embedding row per old mockup chunk
         ps_chunks (list): List of dicts, each chunk from Old PS
         chunk_map (dict): Mapping {old_mockup_chunk_index: ps_chunk_index}
         out_filename (str): Output log filename
+        with_embeddings (bool): Also write the embeddings to a sidecar .npy
 
     Returns: str (output path)
     """
     out_path = os.path.join(DATA_DIR, out_filename)
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write("=== Old Mockup Chunks, Embeddings, and Mapping to Old PS ===\n")
+    embeddings_file = None
+    if with_embeddings and old_mockup_embeddings is not None:
+        n = min(len(old_mockup_chunks), len(old_mockup_embeddings))
+        embeddings_file = _write_embeddings(os.path.splitext(out_path)[0] + ".npy", old_mockup_embeddings, n)
+
+    def rows():
         for idx, chunk in enumerate(old_mockup_chunks):
-            emb = old_mockup_embeddings[idx] if idx < len(old_mockup_embeddings) else None
-            f.write(f"\n--- Old Mockup Chunk {idx+1} ---\n")
-            # Texts
-            f.write(f"Text from old mock up: {chunk['text']}\n")
             ps_idx = chunk_map.get(idx)
-            if ps_idx is not None and ps_idx < len(ps_chunks):
-                f.write(f"Text from old ps: {ps_chunks[ps_idx]['text']}\n")
-            else:
-                f.write("Text from old ps:\n")
-
-            # --- New: print all old_mockup_chunks and ps_chunks with indices for debugging ---
-            f.write("Old mock up chunks and their indices:\n")
-            for omi, omc in enumerate(old_mockup_chunks):
-                f.write(f"  [{omi}] {repr(omc.get('text', ''))}\n")
-            f.write("PS Chunks and their indices:\n")
-            for psi, psc in enumerate(ps_chunks):
-                f.write(f"  [{psi}] {repr(psc.get('text', ''))}\n")
-            # -------------------------------------------------------------------------------
-
-            # Chunk size
-            f.write(f"chunk size considered: {len(chunk['text'])}\n")
-            # Embedding
-            f.write(f"Embedding: {np.array2string(np.array(emb), precision=4, separator=', ') if emb is not None else 'N/A'}\n")
-            # Mapping info
-            if ps_idx is not None and ps_idx < len(ps_chunks):
-                f.write(f"Mapped to Old PS Paragraph {ps_idx+1}\n")
-            else:
-                f.write("No mapping to Old PS found.\n")
-        f.write("\n=== End of Old Mockup Log ===\n")
-    return out_path
+            mapped = ps_idx is not None and ps_idx < len(ps_chunks)
+            yield {
+                "idx": idx,
+                "text": chunk.get("text", ""),
+                "chars": len(chunk.get("text", "")),
+                "ps_idx": ps_idx if mapped else None,
+                "ps_text": ps_chunks[ps_idx].get("text", "") if mapped else None,
+            }
+
+    header = {
+        "log": "old_mockup",
+        "chunks": len(old_mockup_chunks),
+        "ps_chunks": len(ps_chunks),
+        "mapped": sum(1 for j in chunk_map.values() if j is not None and j < len(ps_chunks)),
+        "embeddings": embeddings_file,
+    }
+    return _write_jsonl(out_path, header, rows())
 
 def write_new_mockup_log(
     new_mockup_chunks,
     new_mockup_embeddings,
-    out_filename="new_mockup_chunks_log.txt"
+    out_filename="new_mockup_chunks_log.jsonl",
+    with_embeddings=True
 ):
     """
     Logs all chunks of New Mockup and their embeddings.
 
     Args:
         new_mockup_chunks (list): List of dicts, each chunk from New Mockup
-        new_mockup_embeddings (list): List of vectors (np.ndarray or list), each embedding for new mockup chunk
+        new_mockup_embeddings (np.ndarray or list): One embedding row per new mockup chunk
         out_filename (str): Output log filename
+        with_embeddings (bool): Also write the embeddings to a sidecar .npy
 
     Returns: str (output path)
     """
     out_path = os.path.join(DATA_DIR, out_filename)
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write("=== New Mockup Chunks and Embeddings ===\n")
-        for idx, chunk in enumerate(new_mockup_chunks):
-            emb = new_mockup_embeddings[idx] if idx < len(new_mockup_embeddings) else None
-            f.write(f"\n--- New Mockup Chunk {idx+1} ---\n")
-            f.write(f"Text: {chunk['text']}\n")
-            f.write(f"Embedding: {np.array2string(np.array(emb), precision=4, separator=', ') if emb is not None else 'N/A'}\n")
-        f.write("\n=== End of New Mockup Log ===\n")
-    return out_path
+    embeddings_file = None
+    if with_embeddings and new_mockup_embeddings is not None:
+        n = min(len(new_mockup_chunks), len(new_mockup_embeddings))
+        embeddings_file = _write_embeddings(os.path.splitext(out_path)[0] + ".npy", new_mockup_embeddings, n)
+
+    rows = ({"idx": idx, "text": chunk.get("text", ""), "chars": len(chunk.get("text", ""))}
+            for idx, chunk in enumerate(new_mockup_chunks))
+    header = {"log": "new_mockup", "chunks": len(new_mockup_chunks), "embeddings": embeddings_file}
+    return _write_jsonl(out_path, header, rows)
+
+def diagnostics_enabled(level=DIAGNOSTICS_LEVEL):
+    if level not in DIAGNOSTICS_LEVELS:
+        logger.warning(f"Unknown DIAGNOSTICS_LEVEL {level!r}; diagnostics disabled")
+        return False
+    return level != "off"
+
+def _log_failure(future):
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Writing chunk diagnostics failed", exc_info=exc)
+
+def submit(fn, *args, **kwargs):
+    """Runs fn on the diagnostics thread; failures are logged, never raised to the caller."""
+    future = _executor.submit(fn, *args, **kwargs)
+    future.add_done_callback(_log_failure)
+    return future
 
 # Example usage for demonstration (not called unless run directly)
 if __name__ == "__main__":
-    '''
     # Sample dummy data for demo/testing
     ps_chunks = [
         {"text": "Thank you for being a valued client."},
@@ -116,6 +173,5 @@ if __name__ == "__main__":
     new_mockup_embeddings = [
         [5678.0, 0.0], [1235.0, 0.0], [9101112.0, 0.0]
     ]
-    '''
-    write_old_mockup_log(old_mockup_chunks, old_mockup_embeddings, ps_chunks, chunk_map)
-    write_new_mockup_log(new_mockup_chunks, new_mockup_embeddings)
\ No newline at end of file
+    print(write_old_mockup_log(old_mockup_chunks, old_mockup_embeddings, ps_chunks, chunk_map))
+    print(write_new_mockup_log(new_mockup_chunks, new_mockup_embeddings))
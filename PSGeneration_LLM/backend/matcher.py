@@ -0,0 +1,96 @@
+"""
+matcher.py
+
+Vectorized nearest-neighbour matching between two sets of chunk embeddings.
+
+Embeddings are stacked into contiguous float32 matrices and L2-normalized once,
+so cosine similarity becomes a plain dot product. Queries are processed in
+blocks to bound the size of the (block, n_target) similarity buffer, and the
+top-k targets per query are selected with argpartition instead of a full sort.
+"""
+
+import numpy as np
+
+DEFAULT_BLOCK_SIZE = 1024
+
+def to_matrix(embeddings):
+    """
+    Stack a list of vectors (or an existing array) into a C-contiguous float32 (n, d) matrix.
+    """
+    if isinstance(embeddings, np.ndarray):
+        matrix = embeddings
+    elif len(embeddings) == 0:
+        return np.zeros((0, 0), dtype=np.float32)
+    else:
+        matrix = np.vstack([np.asarray(e, dtype=np.float32).ravel() for e in embeddings])
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    return np.ascontiguousarray(matrix, dtype=np.float32)
+
+def normalize_rows(matrix):
+    """
+    Return a float32 copy of matrix with every row scaled to unit length.
+    Zero rows stay zero, so their similarity to anything is 0.0.
+    """
+    matrix = to_matrix(matrix)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+def top_k_matches(query, target, k=1, block_size=DEFAULT_BLOCK_SIZE, normalized=False):
+    """
+    For each row of query, find the k most cosine-similar rows of target.
+
+    Args:
+        query: (n, d) matrix or list of vectors.
+        target: (m, d) matrix or list of vectors.
+        k (int): Number of matches per query row (clipped to m).
+        block_size (int): Query rows multiplied against target per step.
+        normalized (bool): Set when both inputs are already unit-normalized float32.
+
+    Returns:
+        (indices, sims): two (n, k) arrays, best match first. Ties keep the lower target index.
+    """
+    if not normalized:
+        query = normalize_rows(query)
+        target = normalize_rows(target)
+    n, m = query.shape[0], target.shape[0]
+    k = min(k, m)
+    indices = np.empty((n, k), dtype=np.int64)
+    sims = np.empty((n, k), dtype=np.float32)
+    if n == 0 or k == 0:
+        return indices, sims
+
+    target_t = target.T
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        block = query[start:stop] @ target_t
+        if k == 1:
+            best = np.argmax(block, axis=1)
+            indices[start:stop, 0] = best
+            sims[start:stop, 0] = block[np.arange(stop - start), best]
+            continue
+        if k < m:
+            part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        else:
+            part = np.broadcast_to(np.arange(m), (stop - start, m))
+        part_sims = np.take_along_axis(block, part, axis=1)
+        # stable sort on descending similarity, then by index, so ties resolve like argmax
+        order = np.lexsort((part, -part_sims), axis=1)
+        indices[start:stop] = np.take_along_axis(part, order, axis=1)
+        sims[start:stop] = np.take_along_axis(part_sims, order, axis=1)
+    return indices, sims
+
+def best_matches(query, target, block_size=DEFAULT_BLOCK_SIZE, normalized=False):
+    """
+    Best single match per query row.
+
+    Returns:
+        List[Tuple[int or None, float]]: (target_idx, similarity) per query row.
+        When target is empty every row gets (None, -1.0), as the old pairwise loops did.
+    """
+    n = len(query)
+    if len(target) == 0:
+        return [(None, -1.0)] * n
+    indices, sims = top_k_matches(query, target, k=1, block_size=block_size, normalized=normalized)
+    return [(int(j), float(s)) for j, s in zip(indices[:, 0], sims[:, 0])]
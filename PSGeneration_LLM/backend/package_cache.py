@@ -0,0 +1,133 @@
+"""
+package_cache.py
+
+Process-wide LRU cache of parsed .docx packages, keyed by doc_id.
+
+An entry holds the raw package bytes and a python-docx Document parsed from
+them once (every XML part as an lxml tree). Jobs never edit the cached
+Document; clone() hands out a copy-on-write copy instead: the main document
+part (word/document.xml, the only part the updater edits) is deep-copied into
+a fresh package, and every other part (styles, numbering, headers, images,
+...) is shared by reference with the cached template. A hot PS template is
+thus unzipped and parsed once and stays resident between jobs.
+
+Entries are keyed by the file's mtime, so a re-upload replaces the stale
+entry on next access, and are evicted least-recently-used first once their
+estimated size exceeds PACKAGE_CACHE_MAX_BYTES.
+"""
+
+import os
+import zipfile
+import threading
+import logging
+from io import BytesIO
+from copy import deepcopy
+from collections import OrderedDict
+from docx import Document
+
+from utils import PACKAGE_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Measured resident size of python-docx/lxml trees per byte of uncompressed XML.
+TREE_BYTES_PER_XML_BYTE = 5
+
+def _xml_size(raw):
+    with zipfile.ZipFile(BytesIO(raw)) as zf:
+        return sum(i.file_size for i in zf.infolist() if i.filename.endswith((".xml", ".rels")))
+
+def _copy_rels(source, target, replace):
+    """Re-creates source's relationships on target, pointing at replace.get(part, part)."""
+    for rel in source.rels.values():
+        if rel.is_external:
+            target.load_rel(rel.reltype, rel.target_ref, rel.rId, True)
+        else:
+            target.load_rel(rel.reltype, replace.get(rel.target_part, rel.target_part), rel.rId)
+
+class DocxPackage:
+    """Raw bytes and the parsed template Document of one .docx."""
+
+    def __init__(self, doc_id, raw):
+        self.doc_id = doc_id
+        self.raw = raw
+        self.template = Document(BytesIO(raw))
+        self.nbytes = len(raw) + TREE_BYTES_PER_XML_BYTE * _xml_size(raw)
+        self._shareable = self._parts_are_shareable()
+
+    def _parts_are_shareable(self):
+        # Sharing is only safe if no other part links back to the main document part.
+        main = self.template.part
+        return not any(
+            not rel.is_external and rel.target_part is main
+            for part in main.package.iter_parts() if part is not main
+            for rel in part.rels.values()
+        )
+
+    def clone(self):
+        """
+        A Document that can be edited and saved without affecting the template.
+
+        Returns:
+            docx.document.Document
+        """
+        if not self._shareable:
+            return Document(BytesIO(self.raw))
+        main = self.template.part
+        package = type(main.package)()
+        part = type(main)(main.partname, main.content_type, deepcopy(main.element), package)
+        _copy_rels(main, part, {})
+        _copy_rels(main.package, package, {main: part})
+        return part.document
+
+class PackageCache:
+    def __init__(self, max_bytes=PACKAGE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # doc_id -> (mtime, DocxPackage)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def total_bytes(self):
+        return sum(entry.nbytes for _, entry in self._entries.values())
+
+    def get(self, doc_id, path):
+        """The cached DocxPackage for doc_id, (re)loading it from path on a miss or change."""
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            cached = self._entries.get(doc_id)
+            if cached is not None and cached[0] == mtime:
+                self._entries.move_to_end(doc_id)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        with open(path, "rb") as f:
+            entry = DocxPackage(doc_id, f.read())
+
+        with self._lock:
+            self._entries[doc_id] = (mtime, entry)
+            self._entries.move_to_end(doc_id)
+            self._evict()
+        return entry
+
+    def clone(self, doc_id, path):
+        """Editable copy of the document at path (see DocxPackage.clone)."""
+        return self.get(doc_id, path).clone()
+
+    def invalidate(self, doc_id=None):
+        with self._lock:
+            if doc_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(doc_id, None)
+
+    def _evict(self):
+        total = self.total_bytes
+        # Always keep the most recent entry, even if it alone exceeds the budget.
+        while total > self.max_bytes and len(self._entries) > 1:
+            doc_id, (_, entry) = self._entries.popitem(last=False)
+            total -= entry.nbytes
+            logger.info(f"Evicted package {doc_id} from cache ({entry.nbytes} bytes)")
+
+package_cache = PackageCache()
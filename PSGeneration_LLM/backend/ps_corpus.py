@@ -0,0 +1,265 @@
+"""
+ps_corpus.py
+
+One shared vector index over every ingested PS document.
+
+Rows are the unit-normalized chunk embeddings of each PS (taken from its
+memory-mapped store, see vector_store.py), appended document by document, so a
+row maps back to (doc_id, chunk index) through the per-document start offsets
+in the manifest. A whole mockup is matched against all PS documents with one
+batched search instead of one FAISS load and search per PS.
+
+Files in data/corpus:
+    ps_corpus.faiss  inner-product FAISS index (flat, or the configured ANN type
+                     once it reaches vectorstore.min_ann_vectors rows)
+    ps_corpus.json   manifest: dim and [{"doc_id", "start", "count"}, ...]
+
+    ps_corpus.lock   flock()ed by writers
+
+Writers are serialized across threads and worker processes: an add holds the
+lock file while it reloads the latest index, appends and saves, so concurrent
+adds from two workers both land. Readers take no lock and pick up changes on
+their next call (the manifest's mtime is checked). Without fcntl (Windows) only
+threads are serialized; `python ps_corpus.py --rebuild` restores the corpus from
+the per-document stores if a concurrent add was lost.
+
+Each save rewrites the whole index, so an add costs O(corpus rows) of disk
+writes on top of the new document's rows. add_documents appends a batch of
+documents with a single save; batch ingestion uses it.
+
+Usage:
+    python ps_corpus.py --rebuild
+"""
+
+import os
+import json
+import glob
+import argparse
+import threading
+import logging
+from contextlib import contextmanager
+from collections import defaultdict
+import numpy as np
+import faiss
+
+from utils import CORPUS_DIR, EMBED_DIR
+from matcher import normalize_rows
+from faiss_index import index_settings, uses_ann, build_index, apply_search_params, search_best, extract_vectors
+from vector_store import has_embeddings, load_embedding_matrix, load_chunk_texts
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = os.path.join(CORPUS_DIR, "ps_corpus.faiss")
+MANIFEST_PATH = os.path.join(CORPUS_DIR, "ps_corpus.json")
+LOCK_PATH = os.path.join(CORPUS_DIR, "ps_corpus.lock")
+
+def _doc_vectors(doc_id):
+    return normalize_rows(np.asarray(load_embedding_matrix(doc_id), dtype=np.float32))
+
+class PSCorpus:
+    def __init__(self, index_path=INDEX_PATH, manifest_path=MANIFEST_PATH, lock_path=LOCK_PATH):
+        self.index_path = index_path
+        self.manifest_path = manifest_path
+        self.lock_path = lock_path
+        self.index = None
+        self.docs = []
+        self._starts = np.zeros(0, dtype=np.int64)
+        self._loaded_mtime = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _writing(self):
+        """Exclusive write access: the thread lock, then the cross-process lock file."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """(Re)loads index and manifest when another process or run has changed them."""
+        if not os.path.exists(self.manifest_path):
+            return
+        mtime = os.path.getmtime(self.manifest_path)
+        if mtime == self._loaded_mtime:
+            return
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.index = apply_search_params(faiss.read_index(self.index_path), index_settings())
+        self.docs = manifest["docs"]
+        self._starts = np.array([d["start"] for d in self.docs], dtype=np.int64)
+        self._loaded_mtime = mtime
+
+    def _save(self):
+        # Index first, manifest last: readers key off the manifest.
+        tmp_index = self.index_path + ".tmp"
+        faiss.write_index(self.index, tmp_index)
+        os.replace(tmp_index, self.index_path)
+        tmp_manifest = self.manifest_path + ".tmp"
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump({"dim": int(self.index.d), "docs": self.docs}, f)
+        os.replace(tmp_manifest, self.manifest_path)
+        self._starts = np.array([d["start"] for d in self.docs], dtype=np.int64)
+        self._loaded_mtime = os.path.getmtime(self.manifest_path)
+
+    def __contains__(self, doc_id):
+        return any(d["doc_id"] == doc_id for d in self.docs)
+
+    def __len__(self):
+        return 0 if self.index is None else int(self.index.ntotal)
+
+    def add_document(self, doc_id):
+        """
+        Appends a PS document's embeddings. No-op if it is already in the corpus.
+
+        Returns:
+            int: Rows added.
+        """
+        return self.add_documents([doc_id])
+
+    def add_documents(self, doc_ids):
+        """
+        Appends several PS documents' embeddings and saves the index once. Documents
+        already in the corpus are skipped.
+
+        Returns:
+            int: Rows added.
+        """
+        with self._writing():
+            # Under the lock file, so documents another worker just added are kept.
+            self._refresh()
+            settings = index_settings()
+            added = 0
+            for doc_id in doc_ids:
+                if doc_id in self:
+                    continue
+                vectors = _doc_vectors(doc_id)
+                start = len(self)
+                if self.index is None:
+                    self.index = build_index(vectors, settings, metric=faiss.METRIC_INNER_PRODUCT)
+                else:
+                    self.index.add(vectors)
+                self.docs.append({"doc_id": doc_id, "start": start, "count": int(len(vectors))})
+                added += len(vectors)
+                logger.info(f"Added {len(vectors)} chunks of {doc_id} to the PS corpus ({len(self)} rows)")
+            if not added:
+                return 0
+            if uses_ann(self.index.ntotal, settings) and isinstance(faiss.downcast_index(self.index), faiss.IndexFlat):
+                # Grown past the ANN threshold: rebuild once as the configured index type.
+                self.index = build_index(extract_vectors(self.index), settings, metric=faiss.METRIC_INNER_PRODUCT)
+            self._save()
+            return added
+
+    def rebuild(self, doc_ids):
+        """Rebuilds the corpus from scratch over doc_ids (those without an embedding store are skipped)."""
+        with self._writing():
+            parts, docs, start = [], [], 0
+            for doc_id in doc_ids:
+                if not has_embeddings(doc_id):
+                    logger.warning(f"No embedding store for {doc_id}; not added to the PS corpus")
+                    continue
+                vectors = _doc_vectors(doc_id)
+                parts.append(vectors)
+                docs.append({"doc_id": doc_id, "start": start, "count": int(len(vectors))})
+                start += len(vectors)
+            if not parts:
+                return 0
+            self.index = build_index(np.vstack(parts), index_settings(), metric=faiss.METRIC_INNER_PRODUCT)
+            self.docs = docs
+            self._save()
+            return start
+
+    def locate(self, rows):
+        """Maps corpus rows to (doc_id, chunk_idx)."""
+        doc_pos = np.searchsorted(self._starts, rows, side="right") - 1
+        return [(self.docs[p]["doc_id"], int(r - self.docs[p]["start"])) for p, r in zip(doc_pos, rows)]
+
+    def match_document(self, query, top_docs=5, chunk_k=3, with_text=True):
+        """
+        Matches every chunk of a document (e.g. a mockup) against the whole corpus in one search.
+
+        Documents are ranked by coverage: the sum, over query chunks, of the best similarity
+        that chunk reached within the document, divided by the number of query chunks.
+
+        Args:
+            query (np.ndarray): (n, d) unit-normalized query embeddings.
+            top_docs (int): Documents to return.
+            chunk_k (int): Nearest PS chunks returned per query chunk.
+
+        Returns:
+            dict: {"documents": [{"doc_id", "score", "matched_chunks"}],
+                   "chunks": [{"query_idx", "matches": [{"doc_id", "chunk_idx", "similarity"[, "text"]}]}]}
+        """
+        with self._lock:
+            self._refresh()
+            if not len(self):
+                return {"documents": [], "chunks": []}
+            indices, sims = search_best(self.index, query, k=min(chunk_k, len(self)))
+            n = len(query)
+            valid = indices >= 0
+            located = iter(self.locate(indices[valid]))
+
+        doc_best = defaultdict(dict)  # doc_id -> {query_idx: best sim}
+        chunks = []
+        for qi in range(n):
+            matches = []
+            for j in range(indices.shape[1]):
+                if not valid[qi, j]:
+                    continue
+                doc_id, chunk_idx = next(located)
+                sim = float(sims[qi, j])
+                matches.append({"doc_id": doc_id, "chunk_idx": chunk_idx, "similarity": sim})
+                doc_best[doc_id][qi] = max(sim, doc_best[doc_id].get(qi, -1.0))
+            chunks.append({"query_idx": qi, "matches": matches})
+
+        documents = sorted(
+            ({"doc_id": doc_id, "score": sum(best.values()) / max(1, n), "matched_chunks": len(best)}
+             for doc_id, best in doc_best.items()),
+            key=lambda d: -d["score"],
+        )[:top_docs]
+
+        if with_text:
+            wanted = defaultdict(set)
+            for c in chunks:
+                for m in c["matches"]:
+                    wanted[m["doc_id"]].add(m["chunk_idx"])
+            texts = {}
+            for doc_id, idxs in wanted.items():
+                idxs = sorted(idxs)
+                texts.update({(doc_id, i): t for i, t in zip(idxs, load_chunk_texts(doc_id, idxs))})
+            for c in chunks:
+                for m in c["matches"]:
+                    m["text"] = texts[(m["doc_id"], m["chunk_idx"])]
+        return {"documents": documents, "chunks": chunks}
+
+ps_corpus = PSCorpus()
+
+def ingested_ps_ids():
+    """doc_ids of every PS with a memory-mapped embedding store, oldest first."""
+    manifests = sorted(glob.glob(os.path.join(EMBED_DIR, "ps_*.json")), key=os.path.getmtime)
+    return [os.path.splitext(os.path.basename(p))[0] for p in manifests]
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the cross-document PS corpus index.")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild from every ingested PS")
+    args = parser.parse_args()
+    if args.rebuild:
+        ids = ingested_ps_ids()
+        rows = ps_corpus.rebuild(ids)
+        print(f"PS corpus rebuilt: {len(ps_corpus.docs)} documents, {rows} chunks.")
+    else:
+        ps_corpus._refresh()
+        print(f"PS corpus: {len(ps_corpus.docs)} documents, {len(ps_corpus)} chunks.")
+
+if __name__ == "__main__":
+    main()
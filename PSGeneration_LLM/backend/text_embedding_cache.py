@@ -0,0 +1,110 @@
+"""
+text_embedding_cache.py
+
+Persistent, content-addressed cache of chunk embeddings.
+
+Vectors are stored in a local SQLite database keyed by a hash of the embedding
+model name and the whitespace-normalized chunk text, so re-uploads of the same
+file and chunks shared between old/new mockups are embedded only once. Case is
+preserved in the key because embeddings are case-sensitive.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils import EMBED_CACHE_DB
+
+SQLITE_MAX_VARS = 500
+
+def normalize_for_key(text):
+    return ' '.join(text.strip().split())
+
+def content_key(model, text):
+    return hashlib.sha256(f"{model}\n{normalize_for_key(text)}".encode("utf-8")).hexdigest()
+
+class SQLiteEmbeddingStore:
+    """key -> float32 vector table in a single SQLite file."""
+
+    def __init__(self, path=EMBED_CACHE_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_many(self, keys):
+        """Returns {key: np.ndarray} for the keys present in the store."""
+        found = {}
+        keys = list(keys)
+        with self._connect() as conn:
+            for start in range(0, len(keys), SQLITE_MAX_VARS):
+                batch = keys[start:start + SQLITE_MAX_VARS]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model, items):
+        """items: iterable of (key, vector)."""
+        rows = []
+        for key, vec in items:
+            vec = np.asarray(vec, dtype=np.float32)
+            rows.append((key, model, int(vec.shape[0]), vec.tobytes()))
+        with self._lock, self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO embeddings (key, model, dim, vector) VALUES (?, ?, ?, ?)", rows)
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain Embeddings wrapper that serves vectors from the content-addressed store
+    and sends only cache misses (deduplicated) to the underlying embedding backend.
+
+    misses counts the texts actually sent to the backend (after deduplication);
+    hits counts every other input, including repeats of a text embedded in the
+    same call.
+    """
+
+    def __init__(self, underlying, model, store=None):
+        self.underlying = underlying
+        self.model = model
+        self.store = store or SQLiteEmbeddingStore()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts):
+        keys = [content_key(self.model, t) for t in texts]
+        found = self.store.get_many(set(keys))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self.store.put_many(self.model, new_items)
+            for key, vec in new_items:
+                found[key] = np.asarray(vec, dtype=np.float32)
+        return [found[k].tolist() for k in keys]
+
+    def embed_query(self, text):
+        return self.underlying.embed_query(text)
+
+    def stats_message(self):
+        total = self.hits + self.misses
+        rate = (100.0 * self.hits / total) if total else 0.0
+        return f"Embedding cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate)."
@@ -0,0 +1,131 @@
+"""
+text_index.py
+
+Normalized-text lookup shared by the matching and update stages.
+
+TextIndex maps normalize(text) to the positions holding that text, so "which
+chunk has exactly this text?" is a dict lookup instead of a scan that
+re-normalizes every candidate. Duplicates resolve deterministically: first()
+returns the lowest position, i.e. the first occurrence in input order.
+Empty (or whitespace-only) texts are never indexed and never match.
+
+NearDuplicateIndex finds texts that differ by a few words: word shingles are
+MinHashed and bucketed by LSH bands, so only texts sharing a band are compared
+(by exact shingle Jaccard) instead of every pair.
+"""
+
+import zlib
+import numpy as np
+
+def normalize(text):
+    """Normalize text for matching—strip, collapse spaces, lower-case."""
+    return ' '.join((text or "").strip().split()).lower()
+
+class TextIndex:
+    def __init__(self, texts=()):
+        self._positions = {}
+        self._count = 0
+        for text in texts:
+            self.add(text)
+
+    def add(self, text):
+        """Indexes text at the next position and returns that position."""
+        pos = self._count
+        self._count += 1
+        key = normalize(text)
+        if key:
+            self._positions.setdefault(key, []).append(pos)
+        return pos
+
+    def first(self, text):
+        """Position of the first occurrence of text, or None."""
+        positions = self._positions.get(normalize(text))
+        return positions[0] if positions else None
+
+    def positions(self, text):
+        """All positions holding text, in input order."""
+        return list(self._positions.get(normalize(text), ()))
+
+    def __contains__(self, text):
+        return normalize(text) in self._positions
+
+    def __len__(self):
+        return self._count
+
+
+def shingles(text, k=3):
+    """Set of k-word shingles of the normalized text (the whole text if it is shorter)."""
+    words = normalize(text).split()
+    if len(words) <= k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index over word shingles.
+
+    Args:
+        texts (Iterable[str]): Texts to index, positions in input order.
+        threshold (float): Minimum shingle Jaccard similarity for a match.
+        num_perm (int): MinHash signature length; split into bands of `rows` values.
+        rows (int): Rows per LSH band. Fewer rows find more candidates.
+        k (int): Words per shingle.
+    """
+    def __init__(self, texts=(), threshold=0.8, num_perm=64, rows=4, k=3, seed=1):
+        self.threshold = threshold
+        self.rows = rows
+        self.k = k
+        self.bands = num_perm // rows
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, 2**63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        self._shingles = []
+        self._buckets = [{} for _ in range(self.bands)]
+        for text in texts:
+            self.add(text)
+
+    def _signature(self, sh):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in sh), dtype=np.uint64, count=len(sh))
+        # Multiply-shift hashing: (a * h + b) mod 2**64, top 32 bits, one per permutation.
+        with np.errstate(over="ignore"):
+            return ((np.outer(hashes, self._a) + self._b) >> np.uint64(32)).min(axis=0)
+
+    def _band_keys(self, signature):
+        r = self.rows
+        return [signature[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def add(self, text):
+        """Indexes text at the next position and returns that position."""
+        pos = len(self._shingles)
+        sh = shingles(text, self.k)
+        self._shingles.append(sh)
+        if sh:
+            for band, key in zip(self._buckets, self._band_keys(self._signature(sh))):
+                band.setdefault(key, []).append(pos)
+        return pos
+
+    def best(self, text):
+        """
+        Most similar indexed position at or above the threshold.
+
+        Returns:
+            Tuple[int, float] or None: (position, jaccard); ties go to the lowest position.
+        """
+        sh = shingles(text, self.k)
+        if not sh:
+            return None
+        candidates = set()
+        for band, key in zip(self._buckets, self._band_keys(self._signature(sh))):
+            candidates.update(band.get(key, ()))
+        best = None
+        for pos in sorted(candidates):
+            score = jaccard(sh, self._shingles[pos])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (pos, score)
+        return best
+
+    def __len__(self):
+        return len(self._shingles)
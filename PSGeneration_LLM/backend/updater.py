@@ -1,17 +1,80 @@
 import os
+import sys
 import logging
-from docx import Document
+from copy import deepcopy
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
 from docx.enum.text import WD_COLOR_INDEX
-from utils import UPDATED_DIR
+from utils import UPDATED_DIR, PARSED_JSON_DIR
 from generate_txt_from_docx import save_chunks_info
+from text_index import normalize, TextIndex
+from package_cache import package_cache
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "DocParser"))
+from ParsedStore import existing_parsed_file, read_section
 
 logger = logging.getLogger(__name__)
 
-def normalize(text):
-    return ' '.join(text.strip().split()).lower()
+class BridgeIndex:
+    """
+    Resolves a new-mockup match to its entry in old_mockup_to_ps_matches in O(1).
+
+    Matches carrying "old_idx" resolve by chunk index; otherwise (or when that
+    index has no entry) by normalized matched_old_mockup_chunk text. When several
+    entries share an index or text, the first one in list order wins, which is
+    what the original linear scan returned.
+    """
+
+    def __init__(self, old_mockup_to_ps_matches):
+        self.by_idx = {}
+        for i, om in enumerate(old_mockup_to_ps_matches):
+            old_idx = om.get("old_idx")
+            if old_idx is not None:
+                self.by_idx.setdefault(old_idx, i)
+        self.by_text = TextIndex(om.get("old_mockup_chunk", "") for om in old_mockup_to_ps_matches)
+
+    def resolve(self, match):
+        old_idx = match.get("old_idx")
+        if old_idx is not None and old_idx in self.by_idx:
+            return self.by_idx[old_idx]
+        return self.by_text.first(match.get("matched_old_mockup_chunk", ""))
+
+class StructureMap(dict):
+    """
+    section_path -> [{"para_idx", "docx_idx", "style", "text"}, ...] in document order,
+    plus anchor_index: (section_path, para_idx) -> entry for constant-time anchor lookup.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.anchor_index = {}
+        self.paragraph_count = 0
+
+    def add(self, section_path, para_idx, docx_idx, style, text):
+        entry = {
+            "para_idx": para_idx,
+            "docx_idx": docx_idx,
+            "style": style,
+            "text": text
+        }
+        self.setdefault(section_path, []).append(entry)
+        self.anchor_index.setdefault((section_path, para_idx), entry)
+        self.paragraph_count += 1
+
+    @classmethod
+    def from_dict(cls, mapping):
+        """Wraps a plain section_path -> [entry, ...] dict (the pre-StructureMap shape)."""
+        if isinstance(mapping, cls):
+            return mapping
+        structure_map = cls()
+        for section_path, entries in mapping.items():
+            for e in entries:
+                structure_map.add(section_path, e.get("para_idx"), e["docx_idx"], e.get("style"), e.get("text", ""))
+        return structure_map
 
 def build_ps_structure_map(doc):
-    structure = {}
+    structure = StructureMap()
     current_section = []
     para_counter = {}
     last_heading = None
@@ -33,16 +96,32 @@ def build_ps_structure_map(doc):
             para_counter[section_path] = 0
         para_idx = para_counter[section_path]
         para_counter[section_path] += 1
-        if section_path not in structure:
-            structure[section_path] = []
-        structure[section_path].append({
-            "para_idx": para_idx,
-            "docx_idx": idx,
-            "style": style,
-            "text": para.text
-        })
+        structure.add(section_path, para_idx, idx, style, para.text)
     return structure
 
+def structure_map_from_parsed(paragraphs_and_tables):
+    """
+    Builds the structure map from parsed entries (the paragraphs_and_tables section)
+    without touching the document. Paragraph and heading entries come first, one per
+    doc.paragraphs item and in the same order, so their position is the docx_idx; the
+    section_path/para_idx are the ones annotate_section_path_and_idx gave the chunks,
+    which are exactly the values ps_metadata carries into the updater.
+    """
+    structure = StructureMap()
+    for item in paragraphs_and_tables:
+        if item.get("type") not in ("paragraph", "heading"):
+            continue
+        structure.add(item.get("section_path", ""), item.get("para_idx"), structure.paragraph_count,
+                      item.get("style"), item.get("text", ""))
+    return structure
+
+def load_ps_structure_map(doc_id):
+    """Structure map from the doc_id's saved parsed output, or None if it has not been parsed."""
+    parsed_file = existing_parsed_file(PARSED_JSON_DIR, doc_id)
+    if not os.path.exists(parsed_file):
+        return None
+    return structure_map_from_parsed(read_section(parsed_file, "paragraphs_and_tables", []))
+
 def find_anchor_paragraph(structure_map, section_path, para_idx):
     # fallback to "ROOT" if section_path is empty or not found
     if not section_path or section_path not in structure_map:
@@ -51,11 +130,15 @@ def find_anchor_paragraph(structure_map, section_path, para_idx):
         else:
             # fallback to first available section
             section_path = next(iter(structure_map.keys()))
-    for entry in structure_map[section_path]:
-        if entry["para_idx"] == para_idx:
-            return entry["docx_idx"], entry["style"]
-    # fallback: last para of section
-    return structure_map[section_path][-1]["docx_idx"], structure_map[section_path][-1]["style"]
+    anchor_index = getattr(structure_map, "anchor_index", None)
+    if anchor_index is not None:
+        entry = anchor_index.get((section_path, para_idx))
+    else:
+        entry = next((e for e in structure_map[section_path] if e["para_idx"] == para_idx), None)
+    if entry is None:
+        # fallback: last para of section
+        entry = structure_map[section_path][-1]
+    return entry["docx_idx"], entry["style"]
 
 def copy_format(source_para, target_para):
     """Copies formatting from source_para to target_para (font name, size, bold, etc)."""
@@ -71,12 +154,84 @@ def copy_format(source_para, target_para):
     except Exception as e:
         logger.warning(f"Format copy failed: {e}")
 
+# Paragraph properties that belong to the anchor itself, not to its formatting:
+# a section break, paragraph-mark run properties and tracked-change records.
+_ANCHOR_ONLY_PPR = (qn("w:sectPr"), qn("w:rPr"), qn("w:pPrChange"))
+
+def inserted_ppr(pPr):
+    """Copy of an anchor's w:pPr for a paragraph inserted after it, without anchor-only children."""
+    new_pPr = deepcopy(pPr)
+    for child in list(new_pPr):
+        if child.tag in _ANCHOR_ONLY_PPR:
+            new_pPr.remove(child)
+    return new_pPr
+
+class EditPlan:
+    """
+    Replacements and insertions collected against the original paragraph positions,
+    then applied to the body XML in one pass.
+
+    Positions never shift while planning: every edit refers to the paragraph element
+    captured up front, and new paragraphs are placed with lxml addnext after the
+    anchor (or after the previous insertion for that anchor, keeping chunk order).
+    Applying is O(edits); no paragraph list is rebuilt or searched per edit.
+    """
+
+    def __init__(self, paragraphs):
+        self.paragraphs = paragraphs
+        self.replacements = {}   # docx_idx -> text
+        self.insertions = {}     # docx_idx -> [text, ...] in chunk order
+
+    def is_replaced(self, docx_idx):
+        return docx_idx in self.replacements
+
+    def replace(self, docx_idx, text):
+        self.replacements[docx_idx] = text
+
+    def insert_after(self, docx_idx, text):
+        self.insertions.setdefault(docx_idx, []).append(text)
+
+    @property
+    def insertion_count(self):
+        return sum(len(texts) for texts in self.insertions.values())
+
+    def apply(self):
+        """Applies all edits. Insertions go first so they copy the anchors' original formatting."""
+        for docx_idx in sorted(self.insertions):
+            anchor = self.paragraphs[docx_idx]
+            last = anchor._p
+            for text in self.insertions[docx_idx]:
+                new_p = OxmlElement("w:p")
+                if anchor._p.pPr is not None:
+                    new_p.append(inserted_ppr(anchor._p.pPr))
+                last.addnext(new_p)
+                last = new_p
+                p = Paragraph(new_p, anchor._parent)
+                run = p.add_run(text)
+                run.font.highlight_color = WD_COLOR_INDEX.YELLOW
+                copy_format(anchor, p)
+        for docx_idx in sorted(self.replacements):
+            para = self.paragraphs[docx_idx]
+            para.clear()
+            run = para.add_run(self.replacements[docx_idx])
+            run.font.highlight_color = WD_COLOR_INDEX.YELLOW
+            copy_format(para, para)
+
+def generated_output_path(original_path, job_id=None):
+    """data/updated/<name>_new_generated[_<job_id>].docx; per-job so concurrent generations never collide."""
+    base = os.path.splitext(os.path.basename(original_path))[0] + "_new_generated"
+    if job_id:
+        base += f"_{job_id}"
+    return os.path.join(UPDATED_DIR, base + ".docx")
+
 def update_ps_document_closest(
     original_path,
     new_to_old_mockup_matches,  # [{requirement_chunk, matched_old_mockup_chunk, similarity, ...}]
     old_mockup_to_ps_matches,   # [{old_mockup_chunk, matched_ps_chunk, similarity, ps_metadata}]
     similarity_threshold=0.7,
-    job_id=None, set_progress=None
+    job_id=None, set_progress=None,
+    structure_map=None,
+    status_updates=None
 ):
     """
     Deterministic: For each new mockup chunk,
@@ -87,45 +242,62 @@ def update_ps_document_closest(
         - Else: insert as new para after anchor
     - Copy style from anchor para.
     - Never use LLM to generate/merge.
+
+    structure_map (StructureMap or plain section_path -> entries dict) defaults to the
+    one built from the PS's saved parsed output (doc_id = file name without extension);
+    the document is walked only if that is missing or no longer matches the paragraph count.
+
+    status_updates (list-like, optional) receives status lines as they happen (e.g. a
+    job's StatusLog); it is also returned. Defaults to a new list.
     """
-    status_updates = []
+    if status_updates is None:
+        status_updates = []
     status_updates.append("Loading original PS document for update.")
 
+    # Copy-on-write clone of the cached parse; edits never touch the original file or the cache.
+    doc_id = os.path.splitext(os.path.basename(original_path))[0]
     try:
-        doc = Document(original_path)
+        new_doc = package_cache.clone(doc_id, original_path)
     except Exception as e:
         logger.error(f"Failed to load document: {e}")
         status_updates.append(f"Error loading document: {e}")
         if set_progress and job_id:
             set_progress(job_id, 100, "Error loading document")
         return None, status_updates
+    status_updates.append("Loaded PS document into memory for editing.")
 
-    tmp_path = os.path.join(UPDATED_DIR, "tmp_clone.docx")
-    with open(original_path, "rb") as src, open(tmp_path, "wb") as dst:
-        dst.write(src.read())
-    new_doc = Document(tmp_path)
-    status_updates.append("Cloned PS document for safe editing.")
+    # Captured once; the edit plan refers to these original positions.
+    paragraphs = new_doc.paragraphs
 
     # --- Build section/para structure map for PS ---
-    structure_map = build_ps_structure_map(new_doc)
+    supplied = structure_map is not None
+    if supplied:
+        structure_map = StructureMap.from_dict(structure_map)
+    else:
+        structure_map = load_ps_structure_map(doc_id)
+    if structure_map is None or structure_map.paragraph_count != len(paragraphs):
+        structure_map = build_ps_structure_map(new_doc)
+        status_updates.append("Built PS structure map from the document.")
+    elif supplied:
+        status_updates.append("Using the supplied PS structure map.")
+    else:
+        status_updates.append("Loaded PS structure map from parsed JSON.")
 
-    updated_count = 0
-    inserted_count = 0
+    plan = EditPlan(paragraphs)
     total = len(new_to_old_mockup_matches)
+    last_percent = None
 
     # For detailed logging
     chunk_logs = []
 
+    bridges = BridgeIndex(old_mockup_to_ps_matches)
+
     for idx, m in enumerate(new_to_old_mockup_matches):
         new_chunk = m.get("requirement_chunk", "").strip()
         matched_old_mockup_chunk = m.get("matched_old_mockup_chunk", "").strip()
         mockup_similarity = m.get("similarity", 0.0)
-        old_mockup_idx = None
         # Find the best anchor in PS (via the matched old mockup chunk)
-        for i, om in enumerate(old_mockup_to_ps_matches):
-            if normalize(om.get("old_mockup_chunk", "")) == normalize(matched_old_mockup_chunk):
-                old_mockup_idx = i
-                break
+        old_mockup_idx = bridges.resolve(m)
 
         action_taken = None
         anchor_section_path = anchor_para_idx = anchor_docx_idx = None
@@ -156,31 +328,23 @@ def update_ps_document_closest(
                     status_updates.append(f"Could not find anchor location in PS for chunk {idx+1}, skipping.")
                     action_taken = "Anchor location not found - skipped"
                 else:
-                    para = new_doc.paragraphs[anchor_docx_idx]
-                    if normalize(para.text) == normalize(anchor_ps_chunk):
-                        para.clear()
-                        run = para.add_run(new_chunk)
-                        run.font.highlight_color = WD_COLOR_INDEX.YELLOW
-                        copy_format(para, para)
-                        updated_count += 1
+                    para = paragraphs[anchor_docx_idx]
+                    # An anchor already being replaced keeps its slot; later chunks insert after it.
+                    if not plan.is_replaced(anchor_docx_idx) and normalize(para.text) == normalize(anchor_ps_chunk):
+                        plan.replace(anchor_docx_idx, new_chunk)
                         status_updates.append(f"Replaced anchor para {anchor_docx_idx} for chunk {idx+1}.")
                         action_taken = f"Replaced at section_path='{anchor_section_path}' para_idx={anchor_para_idx} (docx_idx={anchor_docx_idx})"
                     else:
                         # Insert after anchor
-                        new_para = new_doc.add_paragraph("")
-                        p = new_doc.paragraphs.pop()
-                        new_doc.paragraphs.insert(anchor_docx_idx + 1, p)
-                        p.clear()
-                        run = p.add_run(new_chunk)
-                        run.font.highlight_color = WD_COLOR_INDEX.YELLOW
-                        copy_format(para, p)
-                        inserted_count += 1
+                        plan.insert_after(anchor_docx_idx, new_chunk)
                         status_updates.append(f"Inserted new para after anchor {anchor_docx_idx} for chunk {idx+1}.")
                         action_taken = f"Inserted after section_path='{anchor_section_path}' para_idx={anchor_para_idx} (docx_idx={anchor_docx_idx})"
 
         if set_progress and job_id:
             percent = int(10 + 80 * (idx + 1) / max(1, total))
-            set_progress(job_id, percent, f"Inserting chunk {idx+1} of {total}...")
+            if percent != last_percent:
+                set_progress(job_id, percent, f"Inserting chunk {idx+1} of {total}...")
+                last_percent = percent
 
         chunk_logs.append({
             "requirement_chunk": new_chunk,
@@ -194,8 +358,12 @@ def update_ps_document_closest(
             "action_taken": action_taken
         })
 
-    out_name = os.path.splitext(os.path.basename(original_path))[0] + "_new_generated.docx"
-    out_path = os.path.join(UPDATED_DIR, out_name)
+    plan.apply()
+    updated_count = len(plan.replacements)
+    inserted_count = plan.insertion_count
+
+    out_path = generated_output_path(original_path, job_id)
+    out_name = os.path.basename(out_path)
     try:
         new_doc.save(out_path)
         status_updates.append(
@@ -211,7 +379,7 @@ def update_ps_document_closest(
             set_progress(job_id, 100, "Error saving file")
         return None, status_updates
 
-    doc_id = "ps_new_chunks"
+    doc_id = f"ps_new_chunks_{job_id}" if job_id else "ps_new_chunks"
     out_txt_path = save_chunks_info(doc_id, chunk_logs, status_updates)
 
     return out_path, status_updates
\ No newline at end of file
@@ -13,14 +13,37 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 UPLOAD_DIR = os.path.join(DATA_DIR, "uploads")
 UPDATED_DIR = os.path.join(DATA_DIR, "updated")
 VECTOR_DIR = os.path.join(DATA_DIR, "vectorstores")
+EMBED_DIR = os.path.join(DATA_DIR, "embeddings")
+EMBED_CACHE_DB = os.path.join(DATA_DIR, "embedding_cache.sqlite")
 PARSED_JSON_DIR = os.path.join(DOCPARSER_DIR, "ParsedJSON")
 LATEST_IDS_PATH = os.path.join(DOCPARSER_DIR, "latest_ids.json")
+RUNS_DIR = os.path.join(DATA_DIR, "runs")
+CORPUS_DIR = os.path.join(DATA_DIR, "corpus")
+
+# Background jobs (see jobs.py): store kind ("sqlite" is shared across worker processes), TTL, pool size
+JOB_STORE = os.environ.get("JOB_STORE", "sqlite")
+JOB_STORE_DB = os.path.join(DATA_DIR, "jobs.sqlite")
+JOB_TTL_SECONDS = int(os.environ.get("JOB_TTL_SECONDS", "3600"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_STATUS_BUFFER = int(os.environ.get("JOB_STATUS_BUFFER", "500"))
+
+# Memory budget for the in-process embedding matrix cache (see embedding_cache.py)
+EMBED_CACHE_MAX_BYTES = int(float(os.environ.get("EMBED_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+# Memory budget for parsed .docx templates kept between jobs (see package_cache.py)
+PACKAGE_CACHE_MAX_BYTES = int(float(os.environ.get("PACKAGE_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+# Chunk/embedding/mapping dumps per generation (see log_chunk_embeddings_and_mappings.py): off | basic | full
+DIAGNOSTICS_LEVEL = os.environ.get("DIAGNOSTICS_LEVEL", "basic").lower()
 
 # Ensure directories exist
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(UPDATED_DIR, exist_ok=True)
 os.makedirs(VECTOR_DIR, exist_ok=True)
+os.makedirs(EMBED_DIR, exist_ok=True)
 os.makedirs(PARSED_JSON_DIR, exist_ok=True)
+os.makedirs(RUNS_DIR, exist_ok=True)
+os.makedirs(CORPUS_DIR, exist_ok=True)
 
 def new_id(prefix="doc"):
     """
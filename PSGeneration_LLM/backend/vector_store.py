@@ -4,34 +4,140 @@ import json
 import numpy as np
 from utils import EMBED_DIR
 from numpy.linalg import norm
+from matcher import normalize_rows, top_k_matches
 import logging
 
 logger = logging.getLogger(__name__)
 
+# On-disk layout per doc_id in EMBED_DIR:
+#   <doc_id>.npy       raw float32 (n, d) embedding matrix, opened with np.memmap
+#   <doc_id>.text.bin  utf-8 chunk texts, concatenated
+#   <doc_id>.json      manifest: shapes, file names, and per-chunk metadata columns
+#                      (text_offsets has n+1 byte offsets into <doc_id>.text.bin)
+METADATA_COLUMNS = ("index", "type", "source", "style", "section_path", "para_idx", "table_index")
+
+def manifest_path(doc_id):
+    return os.path.join(EMBED_DIR, f"{doc_id}.json")
+
+def has_embeddings(doc_id):
+    return os.path.exists(manifest_path(doc_id))
+
+def _resolve(path):
+    # Manifests store file names relative to EMBED_DIR; older ones stored absolute paths.
+    return path if os.path.isabs(path) else os.path.join(EMBED_DIR, path)
+
+def _write_atomic(path, write):
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def save_embeddings(doc_id, chunks, matrix):
+    """
+    Writes the memory-mappable embedding store for a doc_id.
+
+    Args:
+        doc_id (str): Document identifier.
+        chunks (List[dict]): Chunks in embedding row order, each with 'text' and optional 'metadata'.
+        matrix (np.ndarray): (n, d) embeddings, one row per chunk.
+
+    Returns:
+        str: Manifest path.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    if matrix.shape[0] != len(chunks):
+        raise ValueError(f"{len(chunks)} chunks but {matrix.shape[0]} embeddings for {doc_id}")
+
+    emb_name = f"{doc_id}.npy"
+    text_name = f"{doc_id}.text.bin"
+    encoded = [c["text"].encode("utf-8") for c in chunks]
+    offsets = [0]
+    for b in encoded:
+        offsets.append(offsets[-1] + len(b))
+    columns = {col: [] for col in METADATA_COLUMNS}
+    for i, chunk in enumerate(chunks):
+        meta = chunk.get("metadata", {}) or {}
+        for col in METADATA_COLUMNS:
+            columns[col].append(chunk.get(col, meta.get(col, i if col == "index" else None)))
+
+    def write_matrix(path):
+        with open(path, "wb") as f:
+            np.save(f, matrix)
+
+    def write_texts(path):
+        with open(path, "wb") as f:
+            f.write(b"".join(encoded))
+
+    def write_manifest(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "doc_id": doc_id,
+                "emb_path": emb_name,
+                "text_path": text_name,
+                "count": int(matrix.shape[0]),
+                "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+                "text_offsets": offsets,
+                "columns": columns,
+            }, f, ensure_ascii=False)
+
+    # Manifest last, so readers never see a manifest pointing at half-written files.
+    _write_atomic(os.path.join(EMBED_DIR, emb_name), write_matrix)
+    _write_atomic(os.path.join(EMBED_DIR, text_name), write_texts)
+    out_path = manifest_path(doc_id)
+    _write_atomic(out_path, write_manifest)
+    logger.info(f"Saved {matrix.shape[0]} embeddings for {doc_id} to {EMBED_DIR}")
+    return out_path
+
 def load_manifest(doc_id):
-    meta_path = os.path.join(EMBED_DIR, f"{doc_id}.json")
+    meta_path = manifest_path(doc_id)
     if not os.path.exists(meta_path):
         raise FileNotFoundError(f"Manifest for {doc_id} not found")
     with open(meta_path, "r", encoding="utf-8") as f:
         return json.load(f)
 
+def load_embedding_matrix(doc_id, manifest=None):
+    """
+    Opens a doc_id's embedding matrix read-only with np.memmap; pages are loaded on
+    demand and shared between processes mapping the same file.
+    """
+    manifest = manifest or load_manifest(doc_id)
+    return np.load(_resolve(manifest["emb_path"]), mmap_mode="r")
+
 def load_embeddings(doc_id):
     manifest = load_manifest(doc_id)
-    emb_path = manifest["emb_path"]
-    arr = np.load(emb_path)
-    chunks = manifest["chunks"]
+    arr = load_embedding_matrix(doc_id, manifest)
+    if "columns" not in manifest:
+        return manifest["chunks"], arr
+    with open(_resolve(manifest["text_path"]), "rb") as f:
+        blob = f.read()
+    offsets = manifest["text_offsets"]
+    columns = manifest["columns"]
+    chunks = []
+    for i in range(manifest["count"]):
+        chunk = {col: values[i] for col, values in columns.items()}
+        chunk["text"] = blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+        chunks.append(chunk)
     return chunks, arr
 
+def load_chunk_texts(doc_id, indices, manifest=None):
+    """Texts of selected chunks only, read by byte range from <doc_id>.text.bin."""
+    manifest = manifest or load_manifest(doc_id)
+    if "columns" not in manifest:
+        return [manifest["chunks"][i]["text"] for i in indices]
+    offsets = manifest["text_offsets"]
+    texts = []
+    with open(_resolve(manifest["text_path"]), "rb") as f:
+        for i in indices:
+            f.seek(offsets[i])
+            texts.append(f.read(offsets[i + 1] - offsets[i]).decode("utf-8"))
+    return texts
+
 def cosine_similarity_matrix(A, B):
     """
     A: (n, d)
     B: (m, d)
     returns (n, m) matrix of cosine similarities
     """
-    # normalize
-    a_norm = A / np.linalg.norm(A, axis=1, keepdims=True)
-    b_norm = B / np.linalg.norm(B, axis=1, keepdims=True)
-    return np.dot(a_norm, b_norm.T)
+    return np.dot(normalize_rows(A), normalize_rows(B).T)
 
 def find_best_matches(src_id, tgt_id, top_k=1):
     """
@@ -41,17 +147,15 @@ def find_best_matches(src_id, tgt_id, top_k=1):
     src_chunks, src_emb = load_embeddings(src_id)
     tgt_chunks, tgt_emb = load_embeddings(tgt_id)
 
-    sims = cosine_similarity_matrix(src_emb, tgt_emb)  # (n_src, n_tgt)
+    idxs, sims = top_k_matches(src_emb, tgt_emb, k=top_k)  # (n_src, top_k)
     matches = []
-    for i in range(sims.shape[0]):
-        # top_k best target indices
-        idxs = np.argsort(-sims[i])[:top_k]
-        for j in idxs:
+    for i in range(idxs.shape[0]):
+        for j, sim in zip(idxs[i], sims[i]):
             matches.append({
                 "src_index": src_chunks[i]["index"],
                 "src_text": src_chunks[i]["text"],
                 "tgt_index": tgt_chunks[j]["index"],
                 "tgt_text": tgt_chunks[j]["text"],
-                "similarity": float(sims[i, j])
+                "similarity": float(sim)
             })
     return matches
@@ -2,6 +2,7 @@ import React, { useState, useRef } from "react";
 import axios from "axios";
 
 const API_BASE = "http://localhost:5000";
+const MAX_LOG_LINES = 500;
 
 export default function PSUpdater() {
   const [psFile, setPsFile] = useState(null);
@@ -17,6 +18,7 @@ export default function PSUpdater() {
   const [progressStatus, setProgressStatus] = useState("");
   const [currentJobId, setCurrentJobId] = useState("");
   const pollIntervalRef = useRef(null);
+  const eventSourceRef = useRef(null);
 
   const logStatus = (updates) => {
     if (!updates) return;
@@ -78,18 +80,37 @@ export default function PSUpdater() {
     }
   };
 
+  // Final result (updated file + status log) once the job has finished
+  const fetchResult = (jobId) => {
+    axios.get(`${API_BASE}/result/${jobId}`)
+      .then(res => {
+        setUpdatedFilename(res.data.updated_file || "");
+        logStatus(res.data.status_updates);
+      })
+      .catch(err => {
+        logStatus(err.response?.data?.status_updates);
+        setStatus("Error generating New PS: " + (err.response?.data?.error || err.message));
+      });
+  };
+
   // Progress polling
   const pollProgress = (jobId) => {
     if (!jobId) return;
     axios.get(`${API_BASE}/progress/${jobId}`)
       .then(res => {
-        const { progress, status } = res.data;
+        const { progress, status, state } = res.data;
         setProgress(progress || 0);
         setProgressStatus(status || "");
-        if (progress < 100) {
-          pollIntervalRef.current = setTimeout(() => pollProgress(jobId), 1000);
-        } else {
+        if (state === "done" || state === "failed") {
+          clearTimeout(pollIntervalRef.current);
+          fetchResult(jobId);
+        } else if (state === "unknown") {
+          // The job expired or never existed; it will not appear later.
           clearTimeout(pollIntervalRef.current);
+          setProgressStatus("Error fetching progress.");
+          setStatus(`Error generating New PS: unknown or expired job ${jobId}`);
+        } else {
+          pollIntervalRef.current = setTimeout(() => pollProgress(jobId), 1000);
         }
       })
       .catch(err => {
@@ -99,6 +120,41 @@ export default function PSUpdater() {
       });
   };
 
+  // Live job updates over Server-Sent Events; falls back to polling if the stream fails
+  const streamJob = (jobId) => {
+    if (!window.EventSource) return pollProgress(jobId);
+    const source = new EventSource(`${API_BASE}/events/${jobId}`);
+    eventSourceRef.current = source;
+    source.addEventListener("progress", (e) => {
+      const { progress, status } = JSON.parse(e.data);
+      setProgress(progress || 0);
+      setProgressStatus(status || "");
+    });
+    source.addEventListener("status", (e) => {
+      const line = JSON.parse(e.data);
+      setStatus(line);
+      setStatusLog(prev => [...prev, line].slice(-MAX_LOG_LINES));
+    });
+    source.addEventListener("done", (e) => {
+      const result = JSON.parse(e.data);
+      source.close();
+      setUpdatedFilename(result.updated_file || "");
+      if (result.error) setStatus("Error generating New PS: " + result.error);
+    });
+    source.onerror = (e) => {
+      source.close();
+      if (e.data) {
+        // The server's own "error" event (unknown or expired job): polling would not help.
+        const { error } = JSON.parse(e.data);
+        setProgressStatus("Error fetching progress.");
+        setStatus("Error generating New PS: " + error);
+        return;
+      }
+      // A "done" event closes the stream first, so this only fires on a real failure.
+      pollProgress(jobId);
+    };
+  };
+
   // [3][4] Generate New PS
   const generateNewPS = async () => {
     if (!psDocId || !oldMockDocId || !newMockDocId)
@@ -114,11 +170,10 @@ export default function PSUpdater() {
         old_mock_id: oldMockDocId,
         new_mock_id: newMockDocId
       });
-      setUpdatedFilename(res.data.updated_file);
       logStatus(res.data.status_updates);
       const jobId = res.data.job_id;
       setCurrentJobId(jobId);
-      pollProgress(jobId);
+      streamJob(jobId);
     } catch (err) {
       console.error(err);
       setStatus("Error generating New PS: " + (err.response?.data?.error || err.message));
@@ -137,6 +192,7 @@ export default function PSUpdater() {
   React.useEffect(() => {
     return () => {
       if (pollIntervalRef.current) clearTimeout(pollIntervalRef.current);
+      if (eventSourceRef.current) eventSourceRef.current.close();
     };
   }, []);
 